@@ -1,89 +1,121 @@
+import argparse
+import json
 import os
-import pytesseract
-from PIL import Image
-import pandas as pd
-from PyPDF2 import PdfReader
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
+from sklearn.feature_extraction.text import TfidfVectorizer
 import pickle
+from certificate_features import build_feature_matrix
+from extraction_cache import ExtractionCache
+from model_artifact import ARTIFACT_DIR, save_artifact
+from text_extraction import ExtractionError, extract_text, extractor_version
 
+# Shared with the Flask app, so retraining does not re-OCR unchanged files
+text_cache = ExtractionCache()
 
-def extract_text(file_path):
-    """Extract text from a file (PDF or image)."""
-    if file_path.lower().endswith(".pdf"):
-        text = ""
-        try:
-            reader = PdfReader(file_path)
-            for page in reader.pages:
-                text += page.extract_text()
-        except Exception as e:
-            print(f"Error reading PDF file {file_path}: {e}")
-        return text
-    elif file_path.lower().endswith((".png", ".jpg", ".jpeg")):
-        try:
-            text = pytesseract.image_to_string(Image.open(file_path))
-        except Exception as e:
-            print(f"Error reading image file {file_path}: {e}")
-            text = ""
-        return text
-    else:
-        return ""
+# Extracted features are appended here as they finish, so an interrupted run can resume
+CHECKPOINT_PATH = "features_checkpoint.jsonl"
 
 
 def extract_features(file_path):
-    """Extract features from a file."""
-    text = extract_text(file_path)
+    """Extract features from a file; a failed extraction gives empty text flagged as "failed"."""
+    try:
+        text = text_cache.get_or_extract(file_path, partial(extract_text, strict=True))
+        failed = False
+    except ExtractionError as e:
+        print(e)
+        text, failed = "", True
     return {
         "text_length": len(text),
         "word_count": len(text.split()),
-        "text": text
+        "text": text,
+        "failed": failed
     }
 
 
-def prepare_dataset(dataset_folder):
-    """Prepare dataset from the given folder."""
-    data = []
-    labels = []
-
-    for label in os.listdir(dataset_folder):
+def list_dataset(dataset_folder):
+    """(file path, label) for every file under dataset_folder/<label>/, in a stable order."""
+    files = []
+    for label in sorted(os.listdir(dataset_folder)):
         label_folder = os.path.join(dataset_folder, label)
         if os.path.isdir(label_folder):
-            for file_name in os.listdir(label_folder):
+            for file_name in sorted(os.listdir(label_folder)):
                 file_path = os.path.join(label_folder, file_name)
                 if os.path.isfile(file_path):
-                    features = extract_features(file_path)
-                    data.append(features)
-                    labels.append(label)
+                    files.append((file_path, label))
+    return files
+
+
+def load_checkpoint(checkpoint_path):
+    """Features already extracted by earlier runs, keyed by file path."""
+    done = {}
+    if not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path) as checkpoint:
+        for line in checkpoint:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Last line of an interrupted run
+            done[record["path"]] = record
+    return done
+
+
+def _extract_record(file_path, label):
+    return {"path": file_path, "mtime": os.path.getmtime(file_path), "extractor": extractor_version(),
+            "label": label, "features": extract_features(file_path)}
+
+
+def prepare_dataset(dataset_folder, workers=None, checkpoint_path=CHECKPOINT_PATH):
+    """Prepare dataset from the given folder, extracting files in parallel and resuming from the checkpoint."""
+    files = list_dataset(dataset_folder)
+    done = load_checkpoint(checkpoint_path)
+    # Files modified since they were checkpointed, by another extractor or that failed are extracted again
+    todo = [(path, label) for path, label in files
+            if path not in done or done[path]["mtime"] != os.path.getmtime(path)
+            or done[path].get("extractor") != extractor_version()
+            or done[path]["features"].get("failed")]
+    print(f"{len(files) - len(todo)} of {len(files)} files already extracted, {len(todo)} to go")
+
+    if todo:
+        with open(checkpoint_path, "a") as checkpoint, ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_extract_record, path, label) for path, label in todo]
+            for count, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                checkpoint.write(json.dumps(record) + "\n")
+                checkpoint.flush()
+                done[record["path"]] = record
+                if count % 25 == 0 or count == len(todo):
+                    print(f"Extracted {count}/{len(todo)} files")
+
+    data = [done[path]["features"] for path, _ in files]
+    labels = [label for _, label in files]
     return data, labels
 
 def main():
-    dataset_folder = "dataset"  # Replace with your dataset folder path
-    print("Extracting features from dataset...")
-    data, labels = prepare_dataset(dataset_folder)
+    parser = argparse.ArgumentParser(description="Train the certificate classifier.")
+    parser.add_argument("dataset_folder", nargs="?", default="dataset",
+                        help="Folder with one sub-folder of files per label")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Extraction processes (default: one per CPU)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH,
+                        help="JSON-lines file of extracted features used to resume")
+    args = parser.parse_args()
 
-    # Convert data into a DataFrame
-    df = pd.DataFrame(data)
-    df["label"] = labels
+    print("Extracting features from dataset...")
+    data, labels = prepare_dataset(args.dataset_folder, args.workers, args.checkpoint)
 
-    # Vectorize text features
-    from sklearn.feature_extraction.text import TfidfVectorizer
+    # Vectorize text features, kept sparse alongside the numeric ones
     vectorizer = TfidfVectorizer(max_features=500)
-    text_vectors = vectorizer.fit_transform(df["text"]).toarray()
-
-    # Combine text vectors with other features
-    feature_df = pd.DataFrame(text_vectors)
-    feature_df["text_length"] = df["text_length"]
-    feature_df["word_count"] = df["word_count"]
-    feature_df["label"] = df["label"]
+    text_vectors = vectorizer.fit_transform([features["text"] for features in data])
+    X = build_feature_matrix(text_vectors, data)
+    y = np.array(labels)
 
     # Split dataset
-    X = feature_df.drop("label", axis=1)
-    y = feature_df["label"]
-
-    # Convert column names to strings
-    X.columns = X.columns.astype(str)
-
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
     # Train model
@@ -102,6 +134,9 @@ def main():
     with open("vectorizer.pkl", "wb") as vectorizer_file:
         pickle.dump(vectorizer, vectorizer_file)
 
+    # Memory-mappable copy loaded by the Flask app
+    save_artifact(model, vectorizer, ARTIFACT_DIR)
+
     print("Model and vectorizer saved successfully!")
 
 
@@ -0,0 +1,17 @@
+"""Feature matrix shared by certificate training and serving.
+
+Rows are the TF-IDF vector of a document's text followed by its
+text_length and word_count, kept as a sparse CSR matrix throughout.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+# Numeric columns appended after the TF-IDF terms, in this order
+NUMERIC_FEATURES = ["text_length", "word_count"]
+
+
+def build_feature_matrix(text_vectors, features):
+    """CSR float32 matrix of TF-IDF vectors plus the numeric features of each document."""
+    numeric = np.array([[row[name] for name in NUMERIC_FEATURES] for row in features], dtype=np.float32)
+    numeric = numeric.reshape(len(features), len(NUMERIC_FEATURES))
+    return sp.hstack([text_vectors, sp.csr_matrix(numeric)], format="csr", dtype=np.float32)
@@ -1,125 +1,235 @@
-import csv
-import random
-from datetime import datetime, timedelta
-from faker import Faker
-
-# Initialize Faker for realistic text generation
-fake = Faker()
-
-# Constants
+"""Synthetic feed dataset generator, for load testing the recommender.
+
+Writes users_has_interests, posts, posts_has_likes, posts_has_comments,
+post_comments_has_comments and saved_posts. Table sizes are the base counts
+below times --scale. Rows are sampled with NumPy from a fixed seed and
+appended to the output files in chunks, so memory stays bounded by
+--chunk-size rows per table (plus the per-user interest index).
+
+Usage: python data.py --scale 100 --seed 7 --format parquet --output-dir big/
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Base table sizes, multiplied by --scale
 NUM_USERS = 4500  # 4.5k users
 NUM_POSTS = 10000  # 10k posts
-NUM_INTERESTS = 20  # 20 unique interests
 NUM_LIKES = 80000  # 80k likes
 NUM_COMMENTS = 50000  # 50k comments
 NUM_COMMENT_REPLIES = 30000  # 30k comment replies
 NUM_SAVED_POSTS = 20000  # 20k saved posts
 
-# Generate random interests
 interests = [
-    "Politics", "Music", "Technology", "Sports", "Travel", "Food", "Fashion", 
-    "Health", "Movies", "Gaming", "Art", "Science", "Business", "Education", 
+    "Politics", "Music", "Technology", "Sports", "Travel", "Food", "Fashion",
+    "Health", "Movies", "Gaming", "Art", "Science", "Business", "Education",
     "Environment", "Fitness", "Photography", "Literature", "History", "Cooking"
 ]
 
-# Generate users
-users = [i for i in range(1, NUM_USERS + 1)]
-
-# Generate users_has_interests
-users_has_interests = []
-for user_id in users:
-    user_interests = random.sample(interests, k=random.randint(1, 3))  # Each user has 1-3 interests
-    for interest in user_interests:
-        users_has_interests.append([len(users_has_interests) + 1, user_id, interest, datetime.now(), datetime.now()])
-
-# Write users_has_interests to CSV
-with open("users_has_interests.csv", "w", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow(["id", "user_id", "interest", "created_at", "modified_at"])
-    writer.writerows(users_has_interests)
-
-# Helper function to get user interests
-def get_user_interests(user_id):
-    return [row[2] for row in users_has_interests if row[1] == user_id]
-
-# Generate posts
-posts = []
-for post_id in range(1, NUM_POSTS + 1):
-    user_id = random.choice(users)
-    user_type = random.choice(["user", "page"])
-    user_interests = get_user_interests(user_id)
-    description = f"{fake.sentence()}. This post is about {random.choice(user_interests)}."
-    has_files = random.choice([0, 1])
-    no_of_likes = random.randint(0, 1000)
-    no_of_comments = random.randint(0, 500)
-    no_of_shares = random.randint(0, 200)
-    no_of_saves = random.randint(0, 300)
-    post_privacy = random.choice([0, 1])
-    created_at = datetime.now() - timedelta(days=random.randint(0, 30))
-    modified_at = created_at + timedelta(minutes=random.randint(0, 60))
-    posts.append([post_id, user_id, user_type, description, has_files, no_of_likes, no_of_comments, no_of_shares, no_of_saves, post_privacy, created_at, modified_at])
-
-# Write posts to CSV
-with open("posts.csv", "w", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow(["id", "user_id", "user_type", "description", "has_files", "no_of_likes", "no_of_comments", "no_of_shares", "no_of_saves", "post_privacy", "created_at", "modified_at"])
-    writer.writerows(posts)
-
-# Generate posts_has_likes
-posts_has_likes = []
-for like_id in range(1, NUM_LIKES + 1):
-    post_id = random.choice(posts)[0]
-    liked_by = random.choice(users)
-    posts_has_likes.append([like_id, post_id, liked_by, None, datetime.now(), datetime.now()])
-
-# Write posts_has_likes to CSV
-with open("posts_has_likes.csv", "w", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow(["id", "posts_id", "liked_by", "notification_id", "created_at", "modified_at"])
-    writer.writerows(posts_has_likes)
-
-# Generate posts_has_comments
-posts_has_comments = []
-for comment_id in range(1, NUM_COMMENTS + 1):
-    post_id = random.choice(posts)[0]
-    commented_by = random.choice(users)
-    user_interests = get_user_interests(commented_by)
-    comment = f"{fake.sentence()}. This comment is about {random.choice(user_interests)}."
-    no_of_likes = random.randint(0, 100)
-    no_of_comment_replies = random.randint(0, 50)
-    posts_has_comments.append([comment_id, post_id, commented_by, comment, no_of_likes, no_of_comment_replies, None, datetime.now(), datetime.now()])
-
-# Write posts_has_comments to CSV
-with open("posts_has_comments.csv", "w", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow(["id", "posts_id", "commented_by", "comment", "no_of_likes", "no_of_comment_replies", "notification_id", "created_at", "modified_at"])
-    writer.writerows(posts_has_comments)
-
-# Generate post_comments_has_comments
-post_comments_has_comments = []
-for reply_id in range(1, NUM_COMMENT_REPLIES + 1):
-    post_has_comments_id = random.choice(posts_has_comments)[0]
-    commented_by = random.choice(users)
-    user_interests = get_user_interests(commented_by)
-    comment = f"{fake.sentence()}. This reply is about {random.choice(user_interests)}."
-    no_of_likes = random.randint(0, 50)
-    post_comments_has_comments.append([reply_id, post_has_comments_id, commented_by, comment, None, no_of_likes, datetime.now(), datetime.now()])
-
-# Write post_comments_has_comments to CSV
-with open("post_comments_has_comments.csv", "w", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow(["id", "post_has_comments_id", "commented_by", "comment", "notification_id", "no_of_likes", "created_at", "modified_at"])
-    writer.writerows(post_comments_has_comments)
-
-# Generate saved_posts
-saved_posts = []
-for save_id in range(1, NUM_SAVED_POSTS + 1):
-    user_id = random.choice(users)
-    post_id = random.choice(posts)[0]
-    saved_posts.append([save_id, user_id, post_id, datetime.now(), datetime.now()])
-
-# Write saved_posts to CSV
-with open("saved_posts.csv", "w", newline="") as file:
-    writer = csv.writer(file)
-    writer.writerow(["id", "user_id", "posts_id", "created_at", "modified_at"])
-    writer.writerows(saved_posts)
\ No newline at end of file
+# Faker is far too slow per row, texts are sampled from a pool of its sentences
+SENTENCE_POOL_SIZE = 5000
+
+
+def sentence_pool(seed, size=SENTENCE_POOL_SIZE):
+    """Array of Faker sentences to sample post and comment texts from."""
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    return np.array([fake.sentence() for _ in range(size)], dtype=object)
+
+
+def user_interest_table(rng, num_users, interest_names, min_per_user=1, max_per_user=3):
+    """(user_ids, interest codes, offsets) with distinct interests per user, grouped by user.
+
+    Rows offsets[u - 1]:offsets[u] belong to user u, so a user's interests are
+    found without scanning the table.
+    """
+    counts = rng.integers(min_per_user, max_per_user + 1, size=num_users)
+    # The first k entries of a random permutation are k distinct interests
+    order = np.argsort(rng.random((num_users, len(interest_names))), axis=1)
+    codes = order[np.arange(len(interest_names)) < counts[:, None]]
+    user_ids = np.repeat(np.arange(1, num_users + 1), counts)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return user_ids, codes, offsets
+
+
+def sample_user_interests(rng, user_ids, codes, offsets):
+    """One random interest code of each given user (every user needs at least one)."""
+    starts = offsets[user_ids - 1]
+    counts = offsets[user_ids] - starts
+    return codes[starts + (rng.random(len(user_ids)) * counts).astype(np.int64)]
+
+
+def chunks(total, chunk_size):
+    """(first id, row count) of consecutive chunks covering ids 1..total."""
+    for start in range(0, total, chunk_size):
+        yield start + 1, min(chunk_size, total - start)
+
+
+class TableWriter:
+    """Appends DataFrame chunks to a CSV or Parquet file."""
+
+    def __init__(self, path, fmt="csv"):
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._parquet = None
+
+    def write(self, df):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def write_table(output_dir, name, fmt, frames):
+    """Write the DataFrame chunks produced by frames to <output_dir>/<name>.<fmt>."""
+    started = time.perf_counter()
+    writer = TableWriter(os.path.join(output_dir, f"{name}.{fmt}"), fmt)
+    try:
+        for df in frames:
+            writer.write(df)
+    finally:
+        writer.close()
+    print(f"Wrote {writer.rows} rows to {writer.path} in {time.perf_counter() - started:.1f}s")
+
+
+def generate(output_dir=".", scale=1.0, seed=42, chunk_size=200000, fmt="csv"):
+    """Generate every table of the synthetic dataset."""
+    rng = np.random.default_rng(seed)
+    num_users, num_posts, num_likes, num_comments, num_replies, num_saved = (
+        max(1, round(base * scale)) for base in
+        (NUM_USERS, NUM_POSTS, NUM_LIKES, NUM_COMMENTS, NUM_COMMENT_REPLIES, NUM_SAVED_POSTS)
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    sentences = sentence_pool(seed)
+    interest_names = np.array(interests, dtype=object)
+    now = np.datetime64(datetime.now(), "us")
+    day = np.timedelta64(1, "D")
+    minute = np.timedelta64(1, "m")
+
+    def texts(n, kind, interest_codes):
+        return sentences[rng.integers(0, len(sentences), n)] + f". This {kind} is about " \
+            + interest_names[interest_codes] + "."
+
+    user_ids, interest_codes, offsets = user_interest_table(rng, num_users, interests)
+
+    def users_has_interests():
+        for first, n in chunks(len(user_ids), chunk_size):
+            yield pd.DataFrame({
+                "id": np.arange(first, first + n),
+                "user_id": user_ids[first - 1:first - 1 + n],
+                "interest": interest_names[interest_codes[first - 1:first - 1 + n]],
+                "created_at": np.full(n, now),
+                "modified_at": np.full(n, now),
+            })
+
+    def posts():
+        for first, n in chunks(num_posts, chunk_size):
+            authors = rng.integers(1, num_users + 1, n)
+            created_at = now - rng.integers(0, 31, n) * day
+            yield pd.DataFrame({
+                "id": np.arange(first, first + n),
+                "user_id": authors,
+                "user_type": np.array(["user", "page"])[rng.integers(0, 2, n)],
+                "description": texts(n, "post", sample_user_interests(rng, authors, interest_codes, offsets)),
+                "has_files": rng.integers(0, 2, n),
+                "no_of_likes": rng.integers(0, 1001, n),
+                "no_of_comments": rng.integers(0, 501, n),
+                "no_of_shares": rng.integers(0, 201, n),
+                "no_of_saves": rng.integers(0, 301, n),
+                "post_privacy": rng.integers(0, 2, n),
+                "created_at": created_at,
+                "modified_at": created_at + rng.integers(0, 61, n) * minute,
+            })
+
+    def posts_has_likes():
+        for first, n in chunks(num_likes, chunk_size):
+            yield pd.DataFrame({
+                "id": np.arange(first, first + n),
+                "posts_id": rng.integers(1, num_posts + 1, n),
+                "liked_by": rng.integers(1, num_users + 1, n),
+                "notification_id": np.full(n, np.nan),
+                "created_at": np.full(n, now),
+                "modified_at": np.full(n, now),
+            })
+
+    def posts_has_comments():
+        for first, n in chunks(num_comments, chunk_size):
+            authors = rng.integers(1, num_users + 1, n)
+            yield pd.DataFrame({
+                "id": np.arange(first, first + n),
+                "posts_id": rng.integers(1, num_posts + 1, n),
+                "commented_by": authors,
+                "comment": texts(n, "comment", sample_user_interests(rng, authors, interest_codes, offsets)),
+                "no_of_likes": rng.integers(0, 101, n),
+                "no_of_comment_replies": rng.integers(0, 51, n),
+                "notification_id": np.full(n, np.nan),
+                "created_at": np.full(n, now),
+                "modified_at": np.full(n, now),
+            })
+
+    def post_comments_has_comments():
+        for first, n in chunks(num_replies, chunk_size):
+            authors = rng.integers(1, num_users + 1, n)
+            yield pd.DataFrame({
+                "id": np.arange(first, first + n),
+                "post_has_comments_id": rng.integers(1, num_comments + 1, n),
+                "commented_by": authors,
+                "comment": texts(n, "reply", sample_user_interests(rng, authors, interest_codes, offsets)),
+                "notification_id": np.full(n, np.nan),
+                "no_of_likes": rng.integers(0, 51, n),
+                "created_at": np.full(n, now),
+                "modified_at": np.full(n, now),
+            })
+
+    def saved_posts():
+        for first, n in chunks(num_saved, chunk_size):
+            yield pd.DataFrame({
+                "id": np.arange(first, first + n),
+                "user_id": rng.integers(1, num_users + 1, n),
+                "posts_id": rng.integers(1, num_posts + 1, n),
+                "created_at": np.full(n, now),
+                "modified_at": np.full(n, now),
+            })
+
+    for name, frames in [
+        ("users_has_interests", users_has_interests()),
+        ("posts", posts()),
+        ("posts_has_likes", posts_has_likes()),
+        ("posts_has_comments", posts_has_comments()),
+        ("post_comments_has_comments", post_comments_has_comments()),
+        ("saved_posts", saved_posts()),
+    ]:
+        write_table(output_dir, name, fmt, frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic feed dataset.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplier applied to every base table size")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output-dir", default=".", help="Directory to write the tables to")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format")
+    parser.add_argument("--chunk-size", type=int, default=200000, help="Rows generated and written at a time")
+    args = parser.parse_args()
+    generate(args.output_dir, args.scale, args.seed, args.chunk_size, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""On-disk cache of the text extracted from certificate files.
+
+Entries are keyed by the SHA-256 of the file bytes plus the extractor
+version (text_extraction.extractor_version), so a re-submitted certificate skips OCR / PDF parsing entirely.
+The cache lives in a local SQLite file shared by the Flask app and the
+training script; once it grows past its size limit the least recently
+used entries are evicted.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import closing
+from text_extraction import extractor_version
+
+CACHE_PATH = os.environ.get("EXTRACTION_CACHE_PATH", "extraction_cache.sqlite")
+MAX_CACHE_BYTES = int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def file_digest(file_path):
+    """SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digest(source):
+    """SHA-256 hex digest of a file path's contents or of an in-memory bytes buffer."""
+    if isinstance(source, str):
+        return file_digest(source)
+    return hashlib.sha256(source).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed text cache with size-based LRU eviction."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES, version=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version or extractor_version()
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used)")
+
+    def _connect(self):
+        # A connection per operation keeps the cache safe across threads and processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _key(self, digest):
+        return f"{self.version}:{digest}"
+
+    def get(self, digest):
+        """Cached text for a file digest, or None."""
+        with closing(self._connect()) as db, db:
+            row = db.execute("SELECT text FROM extractions WHERE key = ?", (self._key(digest),)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), self._key(digest)))
+            return row[0]
+
+    def set(self, digest, text):
+        """Store the text extracted for a file digest, evicting old entries if needed."""
+        size = len(text.encode("utf-8"))
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO extractions (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                (self._key(digest), text, size, time.time())
+            )
+            self._evict(db)
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in db.execute("SELECT key, size FROM extractions ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        db.executemany("DELETE FROM extractions WHERE key = ?", stale)
+
+    def get_or_extract(self, source, extract):
+        """Text of a file (path or bytes) from the cache, running extract(source) on a miss.
+
+        If extract raises, nothing is cached and the error propagates, so a
+        transient failure (e.g. tesseract missing) is retried next time.
+        """
+        digest = source_digest(source)
+        text = self.get(digest)
+        if text is None:
+            text = extract(source)
+            self.set(digest, text)
+        return text
@@ -0,0 +1,120 @@
+"""HTTP front end for the feed recommender.
+
+The dataset is loaded into a FeedStore when this module is imported, so a
+pre-forking server shares the parsed tables and index arrays between its
+worker processes (copy-on-write pages), e.g.:
+
+    gunicorn --preload -w 4 --threads 8 feed_server:app
+
+Activity events posted to /events are appended to a shared JSON-lines log
+that every worker tails before answering, so only the feeds of the users
+touched by new events are recomputed.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import Flask, abort, jsonify, request
+from feed_store import FeedStore, append_events, parse_event
+from mainexplore import generate_recommendations
+
+app = Flask(__name__)
+app.config['FEED_DATA_DIR'] = os.environ.get("FEED_DATA_DIR", ".")
+app.config['CACHE_SIZE'] = int(os.environ.get("FEED_CACHE_SIZE", 10000))  # Cached feeds per worker
+app.config['CACHE_TTL'] = float(os.environ.get("FEED_CACHE_TTL", 60))  # Seconds a cached feed stays valid
+app.config['EVENT_LOG'] = os.environ.get("FEED_EVENT_LOG", "activity_events.jsonl")
+app.config['REFRESH_INTERVAL'] = float(os.environ.get("FEED_REFRESH_INTERVAL", 30))  # Seconds between mtime checks
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time-to-live."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+store = FeedStore(app.config['FEED_DATA_DIR'], event_log=app.config['EVENT_LOG'])
+cache = TTLCache(app.config['CACHE_SIZE'], app.config['CACHE_TTL'])
+_refresh_lock = threading.Lock()
+_last_refresh = time.monotonic()
+
+
+def refresh_store():
+    """Ingest new activity events, and reload the dataset if the CSVs changed (checked once per interval)."""
+    global _last_refresh
+    # Cheap when nothing was appended (a stat and a short read), so every request sees other workers' events
+    store.poll_events()
+    if time.monotonic() - _last_refresh < app.config['REFRESH_INTERVAL']:
+        return
+    with _refresh_lock:
+        if time.monotonic() - _last_refresh >= app.config['REFRESH_INTERVAL']:
+            store.refresh()
+            _last_refresh = time.monotonic()
+
+
+@app.route("/recommendations/<int:user_id>")
+def recommendations(user_id):
+    refresh_store()
+
+    # Keyed by data and user version so reloads and new events never serve stale feeds
+    key = (user_id, store.version, store.user_version(user_id))
+    body = cache.get(key)
+    if body is None:
+        body = json.dumps(generate_recommendations(user_id, store))
+        cache.set(key, body)
+    return app.response_class(body, mimetype="application/json")
+
+
+@app.route("/events", methods=["POST"])
+def events():
+    payload = request.get_json(silent=True)
+    batch = payload if isinstance(payload, list) else [payload]
+    # Rejected before reaching the shared log, so no worker ever has to ingest a bad event
+    logged = []
+    for event in batch:
+        try:
+            _, _, created_at = parse_event(event)
+        except ValueError as e:
+            abort(400, description=str(e))
+        # Stamped once here, every worker replaying the log then sees the same time
+        logged.append(dict(event, created_at=str(created_at)))
+
+    append_events(app.config['EVENT_LOG'], logged)
+    affected = store.poll_events()
+    return jsonify({"accepted": len(batch), "users": sorted(affected)})
+
+
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "data_version": store.version, "posts": len(store.posts)})
+
+
+if __name__ == "__main__":
+    app.run(threaded=True)
@@ -0,0 +1,440 @@
+import json
+import os
+import threading
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+from table_cache import load_table
+
+# Tables used by the recommender, keyed by the attribute they are exposed as
+FEED_TABLES = {
+    "posts": "posts.csv",
+    "users_has_interests": "users_has_interests.csv",
+    "posts_has_likes": "posts_has_likes.csv",
+    "posts_has_comments": "posts_has_comments.csv",
+    "saved_posts": "saved_posts.csv",
+}
+
+# Activity event types accepted by FeedStore.ingest
+ACTIVITY_TYPES = ("like", "comment", "save")
+
+
+# Logical fields of each table and the column names they may appear under
+FEED_SCHEMA = {
+    "posts": {
+        "post_id": ["id", "post_id"],
+        "description": ["desc", "description", "content"],
+        "likes": ["likes", "no_of_likes"],
+        "comments": ["comments", "no_of_comments"],
+        "shares": ["shares", "no_of_shares"],
+        "created_at": ["date", "created_at"],
+    },
+    "users_has_interests": {
+        "user_id": ["user_id"],
+        "interest": ["interest"],
+    },
+    "posts_has_likes": {
+        "user_id": ["user", "liked_by"],
+        "post_id": ["post", "posts_id"],
+        "created_at": ["date", "created"],
+    },
+}
+
+
+def find_column(df, possible_names):
+    """Find the column matching one of the names, preferring any exact match to a substring.
+
+    Exact matches are tried for every name before substrings, and a name that
+    matches several columns only as a substring raises ValueError, so a schema
+    change cannot silently switch columns. Returns None if nothing matches.
+    """
+    columns = list(df.columns)
+    for name in possible_names:
+        exact = [col for col in columns if col.lower() == name.lower()]
+        if exact:
+            return exact[0]
+    for name in possible_names:
+        matches = [col for col in columns if name.lower() in col.lower()]
+        if len(matches) > 1:
+            raise ValueError(f"Column name '{name}' is ambiguous, it matches {matches}")
+        if matches:
+            return matches[0]
+    return None
+
+
+def resolve_columns(df, fields):
+    """Frozen mapping of logical field -> physical column (None when absent)."""
+    return MappingProxyType({field: find_column(df, names) for field, names in fields.items()})
+
+
+def as_datetime64(values):
+    """Datetime64 array for a date column, parsing only if it is not parsed already"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy()
+    return pd.to_datetime(values, errors="coerce").to_numpy()
+
+
+def mentions(descriptions, interest):
+    """Boolean mask of the descriptions that mention an interest (case-insensitive)"""
+    return descriptions.astype(str).str.contains(interest, case=False, regex=False, na=False).to_numpy()
+
+
+class InterestIndex:
+    """Inverted index from each interest to the sorted ids of the posts that mention it."""
+
+    def __init__(self, interests):
+        self.interests = list(dict.fromkeys(interests))
+        self.post_ids = {interest: np.empty(0, dtype=np.int64) for interest in self.interests}
+
+    @classmethod
+    def build(cls, post_ids, descriptions, interests):
+        """Index a batch of posts against the given interests."""
+        index = cls(interests)
+        index.add_posts(post_ids, descriptions)
+        return index
+
+    def add_posts(self, post_ids, descriptions):
+        """Merge newly arrived posts into the index."""
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        descriptions = pd.Series(descriptions)
+        for interest in self.interests:
+            matched = post_ids[mentions(descriptions, interest)]
+            if len(matched):
+                self.post_ids[interest] = np.union1d(self.post_ids[interest], matched)
+
+    def posts_for(self, interest):
+        """Sorted ids of the posts mentioning an interest."""
+        return self.post_ids.get(interest, np.empty(0, dtype=np.int64))
+
+    def posts_matching(self, interests):
+        """Sorted ids of the posts mentioning any of the interests."""
+        arrays = [self.posts_for(interest) for interest in interests]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(arrays))
+
+    def contains(self, interest, post_ids):
+        """Boolean mask of the post ids indexed under the interest."""
+        indexed = self.posts_for(interest)
+        post_ids = np.asarray(post_ids, dtype=np.int64)
+        if not len(indexed):
+            return np.zeros(post_ids.shape, dtype=bool)
+        pos = np.minimum(np.searchsorted(indexed, post_ids), len(indexed) - 1)
+        return indexed[pos] == post_ids
+
+    def copy(self):
+        """Independent copy, so posts can be added without touching readers of this one."""
+        index = InterestIndex(self.interests)
+        index.post_ids = dict(self.post_ids)
+        return index
+
+    def interests_of(self, post_id):
+        """Interests a single post is indexed under."""
+        return [interest for interest in self.interests if self.contains(interest, [post_id])[0]]
+
+
+class GroupIndex:
+    """CSR-style index of table rows grouped by a key column (e.g. user_id)."""
+
+    def __init__(self, keys):
+        keys = np.asarray(keys)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys, starts = np.unique(keys[self.order], return_index=True)
+        self.offsets = np.append(starts, len(keys))
+
+    def rows(self, key):
+        """Row positions for a key, in table order."""
+        pos = np.searchsorted(self.keys, key)
+        if pos == len(self.keys) or self.keys[pos] != key:
+            return self.order[:0]
+        return self.order[self.offsets[pos]:self.offsets[pos + 1]]
+
+
+class ActivityWindow:
+    """Per-user interest counters over a sliding window of activity events.
+
+    Events are expected in roughly chronological order; expired ones are
+    dropped lazily from the front of each user's queue when counts are read,
+    and events already outside the window are not added at all.
+    """
+
+    def __init__(self, window=timedelta(days=30)):
+        self.window = np.timedelta64(window)
+        self._events = defaultdict(deque)
+        self._counts = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def add(self, user_id, created_at, interests, now=None):
+        """Count the event's interests for the user; returns False if it already expired."""
+        created_at = np.datetime64(created_at, "us")
+        if created_at < np.datetime64(now or datetime.now(), "us") - self.window:
+            return False
+        with self._lock:
+            self._events[user_id].append((created_at, interests))
+            self._counts[user_id].update(interests)
+        return True
+
+    def counts(self, user_id, now=None):
+        """Interest counts of the user's events inside the window ending at now."""
+        with self._lock:
+            if user_id not in self._events:
+                return Counter()
+            cutoff = np.datetime64(now or datetime.now(), "us") - self.window
+            events = self._events[user_id]
+            counts = self._counts[user_id]
+            while events and events[0][0] < cutoff:
+                _, interests = events.popleft()
+                counts.subtract(interests)
+            return +counts
+
+
+def parse_event(event):
+    """Validated (user_id, post_id, created_at) of an activity event; raises ValueError if malformed."""
+    if not isinstance(event, dict) or event.get("type") not in ACTIVITY_TYPES:
+        raise ValueError(f"Unknown activity type in event {event!r}")
+    for key in ("user_id", "post_id"):
+        if not isinstance(event.get(key), int) or isinstance(event.get(key), bool):
+            raise ValueError(f"Event {key} must be an integer, got {event.get(key)!r}")
+    created_at = event.get("created_at")
+    try:
+        created_at = np.datetime64(created_at, "us") if created_at else np.datetime64(datetime.now(), "us")
+    except (TypeError, ValueError):
+        raise ValueError(f"Event created_at is not a date: {created_at!r}")
+    if np.isnat(created_at):
+        raise ValueError(f"Event created_at is not a date: {event.get('created_at')!r}")
+    return event["user_id"], event["post_id"], created_at
+
+
+def append_events(path, events):
+    """Append activity events to a JSON-lines event log."""
+    lines = "".join(json.dumps(event, default=str) + "\n" for event in events)
+    with open(path, "a") as log:
+        log.write(lines)
+
+
+class FeedSnapshot:
+    """Immutable view of the feed tables and every index derived from them.
+
+    A snapshot is fully built before FeedStore publishes it with a single
+    assignment, so a request that takes store.snapshot once never pairs new
+    tables with old row-position indexes while another thread reloads.
+    """
+
+    def __init__(self, tables, version, interest_index=None):
+        for name, table in tables.items():
+            setattr(self, name, table)
+        self.tables = MappingProxyType(dict(tables))
+        self.version = version
+        self.schema = MappingProxyType({
+            name: resolve_columns(tables.get(name, pd.DataFrame()), fields) for name, fields in FEED_SCHEMA.items()
+        })
+        self.interest_index = interest_index or self._build_interest_index()
+        self._build_user_indexes()
+
+    def _build_interest_index(self):
+        interest_col = self.schema["users_has_interests"]["interest"]
+        interests = self.users_has_interests[interest_col].dropna().unique() if interest_col else []
+        post_id_col = self.schema["posts"]["post_id"]
+        desc_col = self.schema["posts"]["description"]
+        if not post_id_col or not desc_col:
+            return InterestIndex(interests)
+        return InterestIndex.build(self.posts[post_id_col], self.posts[desc_col], interests)
+
+    def _build_user_indexes(self):
+        interests = self.users_has_interests
+        user_id_col = self.schema["users_has_interests"]["user_id"]
+        interest_col = self.schema["users_has_interests"]["interest"]
+        if user_id_col and interest_col:
+            self._interests_by_user = GroupIndex(interests[user_id_col].to_numpy())
+            self._interest_values = interests[interest_col].to_numpy(dtype=object)
+            self.interest_popularity = interests[interest_col].astype(object).value_counts().index.tolist()
+        else:
+            self._interests_by_user = GroupIndex([])
+            self._interest_values = np.empty(0, dtype=object)
+            self.interest_popularity = []
+
+        likes = self.posts_has_likes
+        likes_user_col = self.schema["posts_has_likes"]["user_id"]
+        likes_post_col = self.schema["posts_has_likes"]["post_id"]
+        likes_date_col = self.schema["posts_has_likes"]["created_at"]
+        if likes_user_col and likes_post_col and likes_date_col:
+            self._likes_by_user = GroupIndex(likes[likes_user_col].to_numpy())
+            self._like_posts = likes[likes_post_col].to_numpy()
+            self._like_dates = as_datetime64(likes[likes_date_col])
+        else:
+            self._likes_by_user = GroupIndex([])
+            self._like_posts = np.empty(0, dtype=np.int64)
+            self._like_dates = np.empty(0, dtype="datetime64[us]")
+
+    def user_interests(self, user_id):
+        """Interests the user picked, in table order."""
+        return self._interest_values[self._interests_by_user.rows(user_id)].tolist()
+
+    def user_likes(self, user_id, since=None):
+        """Ids of the posts the user liked, optionally only those liked since a datetime."""
+        rows = self._likes_by_user.rows(user_id)
+        if since is not None:
+            rows = rows[self._like_dates[rows] >= np.datetime64(since)]
+        return self._like_posts[rows]
+
+
+class FeedStore:
+    """In-memory copy of the feed tables, loaded once and shared across requests.
+
+    The tables and their indexes live in self.snapshot (a FeedSnapshot),
+    replaced as a whole on reload; read it once per request for a consistent view.
+    """
+
+    def __init__(self, data_dir=".", files=None, event_log=None):
+        self.data_dir = data_dir
+        self.files = dict(FEED_TABLES, **(files or {}))
+        self.snapshot = None
+        self._mtimes = {}
+        self.activity = ActivityWindow()
+        self.event_log = event_log
+        self._event_offset = 0
+        self._event_inode = None
+        self._event_head = b""
+        self._user_versions = defaultdict(int)
+        self._ingest_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def __getattr__(self, name):
+        # Tables and indexes (posts, schema, interest_index, ...) come from the current snapshot
+        snapshot = self.__dict__.get("snapshot")
+        if snapshot is None or name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(snapshot, name)
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, self.files[name])
+
+    def _current_mtimes(self):
+        mtimes = {}
+        for name in self.files:
+            path = self._path(name)
+            mtimes[name] = os.path.getmtime(path) if os.path.exists(path) else None
+        return mtimes
+
+    def reload(self):
+        """Re-read every table from disk and publish them as a new snapshot."""
+        with self._reload_lock:
+            mtimes = self._current_mtimes()
+            tables = {}
+            for name in self.files:
+                if mtimes[name] is None:
+                    print(f"Table file {self._path(name)} not found, using an empty table")
+                    tables[name] = pd.DataFrame()
+                else:
+                    tables[name] = load_table(self._path(name))
+
+            version = self.snapshot.version + 1 if self.snapshot else 1
+            self.snapshot = FeedSnapshot(tables, version)
+            self._mtimes = mtimes
+
+    def add_posts(self, new_posts):
+        """Append newly published posts and index them without a full reload."""
+        with self._reload_lock:
+            current = self.snapshot
+            posts = current.posts
+            new_posts = new_posts[list(posts.columns)] if len(posts.columns) else new_posts
+            tables = dict(current.tables, posts=pd.concat([posts, new_posts], ignore_index=True))
+
+            # Indexed into a copy, readers of the current snapshot keep their consistent view
+            interest_index = current.interest_index.copy()
+            post_id_col = current.schema["posts"]["post_id"]
+            desc_col = current.schema["posts"]["description"]
+            if post_id_col and desc_col:
+                interest_index.add_posts(new_posts[post_id_col], new_posts[desc_col])
+            self.snapshot = FeedSnapshot(tables, current.version + 1, interest_index)
+
+    def user_version(self, user_id):
+        """Counter bumped whenever an ingested event touches the user."""
+        return self._user_versions.get(user_id, 0)
+
+    def ingest(self, events):
+        """Apply like/comment/save events without a reload. Returns the affected user ids.
+
+        Each event is a dict with "type", "user_id", "post_id" and an optional
+        "created_at"; the interests of the post feed the user's activity counters.
+        Malformed events are logged and skipped, the rest of the batch still applies,
+        and events older than the activity window are ignored.
+        """
+        affected = set()
+        for event in events:
+            try:
+                user_id, post_id, created_at = parse_event(event)
+            except ValueError as e:
+                print(f"Skipping malformed activity event: {e}")
+                continue
+            interests = self.interest_index.interests_of(post_id)
+            if not self.activity.add(user_id, created_at, interests):
+                continue
+            self._user_versions[user_id] += 1
+            affected.add(user_id)
+        return affected
+
+    def poll_events(self):
+        """Ingest the events appended to the event log since the last poll.
+
+        A log that was rotated (replaced or truncated) is read again from the start.
+        """
+        if not self.event_log or not os.path.exists(self.event_log):
+            return set()
+        with self._ingest_lock:
+            stat = os.stat(self.event_log)
+            with open(self.event_log, "rb") as log:
+                # A new file, a shorter one or a different first line all mean the log was rotated
+                head = log.read(len(self._event_head))
+                if stat.st_ino != self._event_inode or stat.st_size < self._event_offset or head != self._event_head:
+                    self._event_inode = stat.st_ino
+                    self._event_offset = 0
+                    self._event_head = b""
+                if stat.st_size <= self._event_offset:
+                    return set()
+                log.seek(self._event_offset)
+                lines = [line.decode() for line in log.readlines()]
+            # Leave a partially written last line for the next poll
+            if lines and not lines[-1].endswith("\n"):
+                lines.pop()
+            self._event_offset += sum(len(line.encode()) for line in lines)
+            if not self._event_head and lines:
+                self._event_head = lines[0].encode()
+            events = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping unreadable event log line: {line.strip()!r}")
+                    continue
+                # Replayed by workers started at any time, so only the logged time is usable
+                if isinstance(event, dict) and not event.get("created_at"):
+                    print(f"Skipping event log line without created_at: {line.strip()!r}")
+                    continue
+                events.append(event)
+            return self.ingest(events)
+
+    def refresh(self):
+        """Reload the tables if any file changed on disk. Returns True if reloaded."""
+        if self._current_mtimes() != self._mtimes:
+            self.reload()
+            return True
+        return False
+
+
+_default_store = None
+
+
+def get_default_store():
+    """Return the process-wide store for the current directory, refreshing it if stale."""
+    global _default_store
+    if _default_store is None:
+        _default_store = FeedStore()
+    else:
+        _default_store.refresh()
+    return _default_store
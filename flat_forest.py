@@ -0,0 +1,119 @@
+"""Array-based evaluator for a trained RandomForestClassifier.
+
+flatten_forest packs every tree of the forest into one set of contiguous
+node arrays (feature, threshold, left, right, class probabilities), with
+leaves pointing at themselves. FlatForest then walks all (sample, tree)
+pairs at once, one depth level per step, so a single document costs a few
+dozen small NumPy operations instead of sklearn's per-call validation and
+per-tree dispatch. Predictions and probabilities are identical to sklearn's.
+
+Usage: python flat_forest.py [certificate_classifier.pkl]  benchmarks it against sklearn.
+"""
+import sys
+import time
+import numpy as np
+import scipy.sparse as sp
+
+
+def flatten_forest(model):
+    """Dict of contiguous node arrays for all trees of a fitted forest classifier."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left < 0
+        roots.append(offset)
+        # Leaves loop back to themselves, so every walk can take the same number of steps
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+        rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+        # Per-leaf class probabilities, normalized as DecisionTreeClassifier.predict_proba does
+        value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": max_depth,
+    }
+
+
+class FlatForest:
+    """Vectorized predict / predict_proba over flattened forest arrays."""
+
+    def __init__(self, arrays, classes, n_features):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(flatten_forest(model), model.classes_, model.n_features_in_)
+
+    def apply(self, X):
+        """Leaf node index of every (sample, tree) pair."""
+        # Trees split on float32 features, exactly as sklearn casts its input
+        X = X.toarray() if sp.issparse(X) else np.asarray(X)
+        X = X.astype(np.float32, copy=False)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        # Summed tree by tree in order, then averaged, matching sklearn's accumulation
+        leaf_values = self.value[self.apply(X).T]
+        return leaf_values.sum(axis=0) / len(self.roots)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def benchmark(model, X, batch_sizes=(1, 10, 1000), repeats=20):
+    """Print mean latency of sklearn vs FlatForest per batch size and check they agree."""
+    flat = FlatForest.from_model(model)
+    for batch_size in batch_sizes:
+        batch = X[:batch_size]
+        if not np.array_equal(flat.predict_proba(batch), model.predict_proba(batch)):
+            raise AssertionError(f"FlatForest disagrees with sklearn at batch size {batch_size}")
+        timings = {}
+        for name, predictor in (("sklearn", model), ("flat", flat)):
+            started = time.perf_counter()
+            for _ in range(repeats):
+                predictor.predict_proba(batch)
+            timings[name] = (time.perf_counter() - started) / repeats * 1000
+        print(f"batch {batch_size:5d}: sklearn {timings['sklearn']:8.2f} ms, "
+              f"flat {timings['flat']:8.2f} ms ({timings['sklearn'] / timings['flat']:.1f}x)")
+
+
+if __name__ == "__main__":
+    import pickle
+
+    with open(sys.argv[1] if len(sys.argv) > 1 else "certificate_classifier.pkl", "rb") as model_file:
+        model = pickle.load(model_file)
+    # TF-IDF-like sparse rows plus length / word count columns
+    rng = np.random.default_rng(0)
+    n_text = model.n_features_in_ - 2
+    text = sp.random(1000, n_text, density=0.05, format="csr", random_state=0, dtype=np.float32)
+    counts = rng.integers(0, 3000, size=(1000, 2)).astype(np.float32)
+    X = sp.hstack([text, sp.csr_matrix(counts)], format="csr")
+    benchmark(model, X)
@@ -0,0 +1,148 @@
+"""Bounded background job queue for CPU-bound work such as OCR.
+
+Jobs run in a local process pool; the web handler only submits them and
+hands back a job id that clients poll. A batch job is one job id over many
+items, each counted as a job of its own. When more than max_pending jobs are
+waiting or running, submit refuses new work so callers can answer with
+503 instead of piling up uploads. Job state lives in the memory of the
+process that owns the queue, so poll the same server process you submit to.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _timed_call(fn, args):
+    """Run fn(*args) in a worker and report when it started and finished."""
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+class JobQueue:
+    """Submit/poll wrapper around a ProcessPoolExecutor with backpressure."""
+
+    def __init__(self, max_workers=None, max_pending=32, keep_finished=600):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished  # Seconds a finished job stays pollable
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Started on first use so importing the app does not fork workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _submit(self, fn, *args):
+        try:
+            return self._pool().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM, native crash) and broke the pool for good, replace it
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            return self._pool().submit(fn, *args)
+
+    def _pending(self):
+        return sum(not future.done() for job in self._jobs.values() for future in job["futures"])
+
+    def pending(self):
+        """Number of jobs (batch items included) queued or running."""
+        with self._lock:
+            return self._pending()
+
+    def _add(self, fn, arg_lists, labels=None):
+        with self._lock:
+            self._expire()
+            pending = self._pending()
+            # A batch bigger than max_pending is still let into an idle queue, or it could never run
+            if pending and pending + len(arg_lists) > self.max_pending:
+                return None
+            job_id = uuid.uuid4().hex
+            # Taken before the job can start, so the time in queue is never negative
+            submitted = time.time()
+            self._jobs[job_id] = {
+                "futures": [self._submit(_timed_call, fn, args) for args in arg_lists],
+                "labels": labels,
+                "submitted": submitted,
+                "finished": None,
+            }
+        return job_id
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) and return its job id, or None when the queue is full."""
+        return self._add(fn, [args])
+
+    def submit_batch(self, fn, arg_lists, labels=None):
+        """Queue fn(*args) for every args in arg_lists as one job; None when they do not all fit.
+
+        labels, if given, name the items in the job's status.
+        """
+        return self._add(fn, list(arg_lists), list(labels) if labels is not None else None)
+
+    def status(self, job_id):
+        """Dict describing a job (state, result or error, timings), or None if unknown.
+
+        A batch job is done once every item finished, and lists each item's
+        label and result or error under "items".
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        futures = job["futures"]
+        remaining = sum(not future.done() for future in futures)
+        if remaining:
+            status = {"job_id": job_id, "state": "running" if any(f.running() for f in futures) else "queued",
+                      "waited": round(time.time() - job["submitted"], 3)}
+            if job["labels"] is not None:
+                status["progress"] = {"done": len(futures) - remaining, "total": len(futures)}
+            return status
+
+        if job["finished"] is None:
+            job["finished"] = time.time()
+        items, times = [], []
+        for future in futures:
+            try:
+                result, started, finished = future.result()
+            except Exception as e:
+                items.append({"result": None, "error": str(e)})
+            else:
+                items.append({"result": result, "error": None})
+                times.append((started, finished))
+
+        if job["labels"] is None and items[0]["error"]:
+            return {"job_id": job_id, "state": "failed", "error": items[0]["error"]}
+        status = {"job_id": job_id, "state": "done"}
+        if job["labels"] is None:
+            status["result"] = items[0]["result"]
+        else:
+            status["items"] = [dict(item, label=label) for item, label in zip(items, job["labels"])]
+        if times:
+            started, finished = min(t[0] for t in times), max(t[1] for t in times)
+            status["timings"] = {
+                "queued": round(started - job["submitted"], 3),
+                "run": round(finished - started, 3),
+                "total": round(finished - job["submitted"], 3),
+            }
+        return status
+
+    def _expire(self):
+        # Forget finished jobs nobody polled for keep_finished seconds
+        cutoff = time.time() - self.keep_finished
+        for job_id, job in list(self._jobs.items()):
+            if all(future.done() for future in job["futures"]):
+                if job["finished"] is None:
+                    job["finished"] = time.time()
+                elif job["finished"] < cutoff:
+                    del self._jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
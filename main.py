@@ -1,24 +1,49 @@
+import time
+
+_import_started = time.perf_counter()
+
+import csv
+import io
 import os
 import pickle
-import pytesseract
-from flask import Flask, render_template_string, request, redirect
+import shutil
+import tempfile
+import threading
+import uuid
+from functools import partial
+from flask import Flask, abort, jsonify, render_template_string, request, redirect, url_for
 from werkzeug.utils import secure_filename
-from PIL import Image
-from PyPDF2 import PdfReader
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from certificate_features import build_feature_matrix
+from extraction_cache import ExtractionCache, source_digest
+from job_queue import JobQueue
+from model_artifact import MANIFEST_NAME, load_artifact
+from text_extraction import ExtractionError, extract_text
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['MAX_FILE_BYTES'] = int(os.environ.get("CERT_MAX_UPLOAD_BYTES", 16 * 1024 * 1024))  # Larger files get 413
+app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_FILE_BYTES'] + 64 * 1024  # Whole request, one file plus form overhead
+app.config['MAX_BATCH_BYTES'] = int(os.environ.get("CERT_MAX_BATCH_BYTES", 1024 * 1024 * 1024))  # Whole /batch request
+app.config['SPILL_THRESHOLD'] = int(os.environ.get("CERT_SPILL_BYTES", 4 * 1024 * 1024))  # Bigger uploads go to a temp file
+app.config['PERSIST_UPLOADS'] = os.environ.get("CERT_PERSIST_UPLOADS", "0") == "1"  # Keep uploads, named by content hash
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'png', 'jpg', 'jpeg'}
 app.secret_key = 'supersecretkey'  # For CSRF protection, can be any string
+app.config['JOB_WORKERS'] = int(os.environ.get("CERT_JOB_WORKERS", os.cpu_count() or 1))  # OCR processes
+app.config['MAX_PENDING_JOBS'] = int(os.environ.get("CERT_MAX_PENDING_JOBS", 32))  # Beyond this uploads get 503
+app.config['MODEL_ARTIFACT'] = os.environ.get("CERT_MODEL_ARTIFACT", "model_artifact")
+app.config['PRELOAD'] = os.environ.get("CERT_PRELOAD", "0") == "1"  # Warm up at import, for gunicorn --preload
+
+# Model and vectorizer are loaded on first use (see load_model / warm_up)
+_model = None
+_vectorizer = None
+_model_lock = threading.Lock()
+startup_timings = {}
 
-# Load the model and vectorizer
-with open("certificate_classifier.pkl", "rb") as model_file:
-    model = pickle.load(model_file)
+# Shared cache of extracted text, so re-submitted files skip OCR
+text_cache = ExtractionCache()
 
-with open("vectorizer.pkl", "rb") as vectorizer_file:
-    vectorizer = pickle.load(vectorizer_file)
+# OCR and prediction run here, off the request threads
+jobs = JobQueue(app.config['JOB_WORKERS'], app.config['MAX_PENDING_JOBS'])
 
 
 def allowed_file(filename):
@@ -26,70 +51,313 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
-def extract_text(file_path):
-    """Extract text from a file (PDF or image)."""
-    if file_path.lower().endswith(".pdf"):
-        text = ""
-        try:
-            reader = PdfReader(file_path)
-            for page in reader.pages:
-                text += page.extract_text()
-        except Exception as e:
-            print(f"Error reading PDF file {file_path}: {e}")
-        return text
-    elif file_path.lower().endswith((".png", ".jpg", ".jpeg")):
-        try:
-            text = pytesseract.image_to_string(Image.open(file_path))
-        except Exception as e:
-            print(f"Error reading image file {file_path}: {e}")
-            text = ""
-        return text
-    else:
-        return ""
+def load_model():
+    """Model and vectorizer, loaded once: the memory-mapped artifact if present, else the pickles."""
+    global _model, _vectorizer
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                started = time.perf_counter()
+                if os.path.exists(os.path.join(app.config['MODEL_ARTIFACT'], MANIFEST_NAME)):
+                    model, vectorizer, _ = load_artifact(app.config['MODEL_ARTIFACT'])
+                else:
+                    with open("certificate_classifier.pkl", "rb") as model_file:
+                        model = pickle.load(model_file)
+                    with open("vectorizer.pkl", "rb") as vectorizer_file:
+                        vectorizer = pickle.load(vectorizer_file)
+                _vectorizer = vectorizer
+                _model = model
+                startup_timings["load_model"] = round(time.perf_counter() - started, 3)
+    return _model, _vectorizer
+
+
+def resident_memory_mb():
+    """Current resident set size of this process in MB (None where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return round(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError):
+        return None
+
+
+def warm_up():
+    """Load the model and extraction backends and run one prediction, so the first request is fast."""
+    if "cold_start" in startup_timings:
+        return startup_timings
+    started = time.perf_counter()
+    import PyPDF2, PIL.Image, pytesseract  # noqa: F401  (imported lazily by extract_text)
+    startup_timings["import_backends"] = round(time.perf_counter() - started, 3)
+
+    model, vectorizer = load_model()
+    started = time.perf_counter()
+    empty = {"text": "", "text_length": 0, "word_count": 0}
+    model.predict_proba(build_feature_matrix(vectorizer.transform([""]), [empty]))
+    startup_timings["first_prediction"] = round(time.perf_counter() - started, 3)
+    startup_timings["cold_start"] = round(time.perf_counter() - _import_started, 3)
+    return startup_timings
+
 
 #this is my name
-def extract_features(file_path):
-    """Extract features from a file."""
-    text = extract_text(file_path)
+def extract_features(source, filename=None, timings=None):
+    """Extract features from a file path or an in-memory file named filename.
+
+    timings, if given, collects the extraction stage times. A failed
+    extraction gives empty text flagged as "failed" with the reason under
+    "error", and is not cached.
+    """
+    try:
+        text = text_cache.get_or_extract(source, partial(extract_text, timings=timings, filename=filename, strict=True))
+        error = None
+    except ExtractionError as e:
+        print(e)
+        text, error = "", str(e)
     return {
         "text_length": len(text),
         "word_count": len(text.split()),
-        "text": text
+        "text": text,
+        "failed": error is not None,
+        "error": error
     }
 
 
-def predict_certificate(file_path):
-    """Predict if the certificate is genuine or not using the trained model."""
-    features = extract_features(file_path)
+def predict_certificate(source, filename=None, timings=None):
+    """Predict if the certificate is genuine or not using the trained model.
+
+    Raises ExtractionError when no text could be extracted, rather than scoring empty text.
+    """
+    features = extract_features(source, filename, timings)
+    if features["failed"]:
+        raise ExtractionError(features["error"])
 
-    # Vectorize the text
-    text_vector = vectorizer.transform([features["text"]]).toarray()
+    model, vectorizer = load_model()
 
-    # Combine with other features
-    feature_array = np.hstack((text_vector, np.array([[features["text_length"], features["word_count"]]])))
+    # Vectorize the text and append the other features, without densifying
+    feature_array = build_feature_matrix(vectorizer.transform([features["text"]]), [features])
 
     # Make the prediction
     prediction = model.predict(feature_array)
     return prediction[0]
 
 
+def verify_files(sources, names=None, map_fn=map):
+    """Predict many files (paths or bytes) with a single vectorizer.transform and model.predict_proba call.
+
+    Extraction goes through map_fn, so callers can pass a pool's map to run it in parallel.
+    Names are required for in-memory files, they tell the file type.
+    """
+    names = names or [os.path.basename(path) for path in sources]
+    return score_features(list(map_fn(extract_features, sources, names)), names)
+
+
+def score_features(features, names):
+    """Prediction and confidence per file, from extract_features results.
+
+    Files whose text could not be extracted get no prediction and an error instead.
+    """
+    results = [{"filename": name, "prediction": None, "confidence": None, "error": f["error"]}
+               for f, name in zip(features, names)]
+    scored = [i for i, f in enumerate(features) if not f["failed"]]
+    if not scored:
+        return results
+    model, vectorizer = load_model()
+    rows = [features[i] for i in scored]
+    probabilities = model.predict_proba(build_feature_matrix(vectorizer.transform([f["text"] for f in rows]), rows))
+    for i, p in zip(scored, probabilities):
+        best = p.argmax()
+        results[i].update(prediction=str(model.classes_[best]), confidence=round(float(p[best]), 4))
+    return results
+
+
+def results_to_csv(results):
+    """CSV text of batch verification results."""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=["filename", "prediction", "confidence", "error"])
+    writer.writeheader()
+    writer.writerows(results)
+    return out.getvalue()
+
+
+def verification_job(source, filename, spilled=False):
+    """Background job: predict one upload, given as bytes or as a spilled temp file."""
+    timings = {}
+    try:
+        prediction = predict_certificate(source, filename, timings)
+    finally:
+        if spilled:
+            os.remove(source)
+    # Empty when the text came from the extraction cache
+    extraction = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    return {"filename": filename, "prediction": str(prediction), "extraction_seconds": extraction}
+
+
+def batch_item_job(source, filename, spilled=False):
+    """Background job: extract the features of one file of a batch."""
+    try:
+        return extract_features(source, filename)
+    finally:
+        if spilled:
+            os.remove(source)
+
+
+def read_upload(file):
+    """(source, spilled): the upload's bytes, or a temp file path if it exceeds SPILL_THRESHOLD.
+
+    Answers 413 when the file is larger than MAX_FILE_BYTES.
+    """
+    limit = app.config['MAX_FILE_BYTES']
+    head = file.stream.read(min(app.config['SPILL_THRESHOLD'], limit) + 1)
+    if len(head) > limit:
+        abort(413, description=f"{file.filename} is larger than {limit} bytes")
+    if len(head) <= app.config['SPILL_THRESHOLD']:
+        return head, False
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(secure_filename(file.filename))[1])
+    with os.fdopen(fd, "wb") as out:
+        out.write(head)
+        size = len(head)
+        chunk = file.stream.read(1024 * 1024)
+        while chunk:
+            size += len(chunk)
+            if size > limit:
+                break
+            out.write(chunk)
+            chunk = file.stream.read(1024 * 1024)
+    if size > limit:
+        os.remove(path)
+        abort(413, description=f"{file.filename} is larger than {limit} bytes")
+    return path, True
+
+
+def discard_uploads(uploads):
+    """Remove the temp files of spilled uploads."""
+    for source, spilled in uploads:
+        if spilled:
+            os.remove(source)
+
+
+def persist_upload(source, filename):
+    """Keep a copy of an upload under UPLOAD_FOLDER, named by the SHA-256 of its content."""
+    extension = os.path.splitext(filename)[1].lower()
+    path = os.path.join(app.config['UPLOAD_FOLDER'], source_digest(source) + extension)
+    if os.path.exists(path):
+        return path
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    if isinstance(source, str):
+        shutil.copyfile(source, tmp_path)
+    else:
+        with open(tmp_path, "wb") as out:
+            out.write(source)
+    os.replace(tmp_path, path)
+    return path
+
+
+def submit_upload(file):
+    """Queue an uploaded file for verification. Returns the job id, or None when busy."""
+    filename = secure_filename(file.filename)
+    source, spilled = read_upload(file)
+    if app.config['PERSIST_UPLOADS']:
+        persist_upload(source, filename)
+    job_id = jobs.submit(verification_job, source, filename, spilled)
+    if job_id is None and spilled:
+        os.remove(source)
+    return job_id
+
+
+def busy_response():
+    response = jsonify({"error": "Too many certificates are being verified, retry shortly",
+                        "pending": jobs.pending()})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
-    result = None
-    filename = None
     if request.method == "POST":
         if "file" not in request.files:
             return redirect(request.url)
         file = request.files["file"]
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            job_id = submit_upload(file)
+            if job_id is None:
+                return busy_response()
+            return redirect(url_for("index", job=job_id))
+
+    job = jobs.status(request.args["job"]) if "job" in request.args else None
+    return render_template_string(HTML_TEMPLATE, job=job)
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue a certificate for verification; poll GET /jobs/<job_id> for the result."""
+    file = request.files.get("file")
+    if not file or not allowed_file(file.filename):
+        abort(400)
+    job_id = submit_upload(file)
+    if job_id is None:
+        return busy_response()
+    response = jsonify({"job_id": job_id, "status_url": url_for("job_status", job_id=job_id)})
+    response.status_code = 202
+    return response
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """Queue every file uploaded under "files" as one job; poll GET /jobs/<job_id> (?format=csv for CSV)."""
+    # Many files per request, so the total gets its own limit; read_upload still caps each file
+    request.max_content_length = app.config['MAX_BATCH_BYTES']
+    files = [file for file in request.files.getlist("files") if file and allowed_file(file.filename)]
+    if not files:
+        abort(400)
 
-            # Predict the certificate type
-            result = predict_certificate(file_path)
+    names = [secure_filename(file.filename) for file in files]
+    uploads = []
+    try:
+        for file in files:
+            uploads.append(read_upload(file))
+    except Exception:
+        discard_uploads(uploads)
+        raise
+    if app.config['PERSIST_UPLOADS']:
+        for (source, _), name in zip(uploads, names):
+            persist_upload(source, name)
+    arg_lists = [(source, name, spilled) for (source, spilled), name in zip(uploads, names)]
+    # Every file counts against MAX_PENDING_JOBS, like a single upload does
+    job_id = jobs.submit_batch(batch_item_job, arg_lists, names)
+    if job_id is None:
+        discard_uploads(uploads)
+        return busy_response()
+    response = jsonify({"job_id": job_id, "files": len(names),
+                        "status_url": url_for("job_status", job_id=job_id, format=request.args.get("format"))})
+    response.status_code = 202
+    return response
 
-    return render_template_string(HTML_TEMPLATE, result=result, filename=filename)
+
+@app.route("/readyz")
+def readyz():
+    """Readiness probe: warms the worker up on first call, then reports its cold start and memory."""
+    try:
+        timings = warm_up()
+    except Exception as e:
+        response = jsonify({"ready": False, "error": str(e)})
+        response.status_code = 503
+        return response
+    return jsonify({"ready": True, "startup_seconds": timings, "rss_mb": resident_memory_mb()})
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.status(job_id)
+    if job is None:
+        abort(404)
+    if "items" in job:
+        # A finished batch: score every extracted file in one predict_proba call
+        items = job.pop("items")
+        features = [item["result"] or {"failed": True, "error": item["error"]} for item in items]
+        job["results"] = score_features(features, [item["label"] for item in items])
+        if request.args.get("format") == "csv":
+            return app.response_class(results_to_csv(job["results"]), mimetype="text/csv")
+    return jsonify(job)
 
 
 HTML_TEMPLATE = '''
@@ -99,6 +367,9 @@ HTML_TEMPLATE = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Certificate Verification</title>
+    {% if job and job.state in ("queued", "running") %}
+    <meta http-equiv="refresh" content="1">
+    {% endif %}
     <style>
         body {
             font-family: Arial, sans-serif;
@@ -167,10 +438,16 @@ HTML_TEMPLATE = '''
 <body>
     <div class="container">
         <h1>Upload Your Certificate</h1>
-        {% if result is not none %}
-            <p>Uploaded Certificate: {{ filename }}</p>
-            <p>Prediction: <strong>{{ result }}</strong></p>
+        {% if job and job.state == "done" %}
+            <p>Uploaded Certificate: {{ job.result.filename }}</p>
+            <p>Prediction: <strong>{{ job.result.prediction }}</strong></p>
+            <p>Verified in {{ job.timings.run }}s ({{ job.timings.queued }}s in queue)</p>
             <a href="/">Upload another certificate</a>
+        {% elif job and job.state == "failed" %}
+            <p>Verification failed: {{ job.error }}</p>
+            <a href="/">Upload another certificate</a>
+        {% elif job %}
+            <p>Verifying your certificate ({{ job.state }})...</p>
         {% else %}
             <form action="/" method="post" enctype="multipart/form-data">
                 <label for="file">Choose a certificate file (PDF, PNG, JPG, JPEG):</label>
@@ -183,7 +460,10 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+if app.config['PRELOAD']:
+    # Loaded before the server forks, so workers share the model pages
+    warm_up()
+
 if __name__ == "__main__":
-    if not os.path.exists('uploads'):
-        os.makedirs('uploads')
+    print(f"Warmed up: {warm_up()}, {resident_memory_mb()} MB resident")
     app.run(debug=True)
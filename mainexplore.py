@@ -1,69 +1,75 @@
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import re
+import heapq
 import json
+from collections import Counter
+from feed_store import FEED_SCHEMA, InterestIndex, as_datetime64, get_default_store, resolve_columns
 
-def find_column(df, possible_names):
-    """Helper function to find columns with similar names"""
-    for name in possible_names:
-        matches = [col for col in df.columns if name.lower() in col.lower()]
-        if matches:
-            return matches[0]
-    return None
+# Half-life (in days) of the continuous recency decay; None keeps the 7-day step
+RECENCY_HALF_LIFE_DAYS = None
 
 def get_or_assign_interests(user_id, users_has_interests):
     """Get or assign top 3 interests for a user"""
-    user_id_col = find_column(users_has_interests, ["user_id"])
-    interest_col = find_column(users_has_interests, ["interest"])
+    columns = resolve_columns(users_has_interests, FEED_SCHEMA["users_has_interests"])
+    user_id_col = columns["user_id"]
+    interest_col = columns["interest"]
     
     if not user_id_col or not interest_col:
         return []
     
     user_interests = users_has_interests[users_has_interests[user_id_col] == user_id][interest_col].tolist()
+    top_interests = users_has_interests[interest_col].value_counts().index.tolist()
+    return assign_interests(user_interests, top_interests)
+
+def assign_interests(user_interests, top_interests):
+    """Top up a user's interests to 3 from the globally most popular ones"""
+    user_interests = list(user_interests)
     
     # Handle cases where user has 0-2 interests
     if not user_interests:
-        top_interests = users_has_interests[interest_col].value_counts().head(3).index.tolist()
-        user_interests = top_interests
+        user_interests = top_interests[:3]
     elif len(user_interests) == 1:
-        top_interests = users_has_interests[interest_col].value_counts().index.tolist()
         interests_to_add = [i for i in top_interests if i not in user_interests][:2]
         user_interests.extend(interests_to_add)
     elif len(user_interests) == 2:
-        top_interests = users_has_interests[interest_col].value_counts().index.tolist()
         interest_to_add = next((i for i in top_interests if i not in user_interests), None)
         if interest_to_add:
             user_interests.append(interest_to_add)
     
     return [i.strip() for i in user_interests[:3]]  # Clean whitespace
 
-def update_interests(user_interests, recent_activity, posts):
-    """Update user interests based on recent activity"""
-    if not recent_activity or not user_interests:
+def update_interests(user_interests, recent_activity, posts, interest_index=None, activity_counts=None):
+    """Update user interests based on recent activity
+
+    activity_counts optionally adds interest counts from streamed activity
+    events (see FeedStore.ingest) on top of the liked posts.
+    """
+    if not (recent_activity or activity_counts) or not user_interests:
         return user_interests
     
-    post_id_col = find_column(posts, ["id", "post_id"]) or posts.columns[0]
-    desc_col = find_column(posts, ["desc", "description", "content"])
+    if interest_index is None and recent_activity:
+        # No shared index: index just the posts the user interacted with
+        columns = resolve_columns(posts, FEED_SCHEMA["posts"])
+        post_id_col = columns["post_id"] or posts.columns[0]
+        desc_col = columns["description"]
+        if not desc_col:
+            return user_interests
+        activity_posts = posts[posts[post_id_col].isin(recent_activity)]
+        if activity_posts.empty:
+            return user_interests
+        interest_index = InterestIndex.build(activity_posts[post_id_col], activity_posts[desc_col], user_interests)
     
-    if not desc_col:
-        return user_interests
+    activity = np.unique(np.asarray(recent_activity, dtype=np.int64))
+    interest_counts = Counter()
+    for interest in user_interests:
+        count = len(np.intersect1d(interest_index.posts_for(interest), activity, assume_unique=True)) if len(activity) else 0
+        count += (activity_counts or {}).get(interest, 0)
+        if count:
+            interest_counts[interest] = count
     
-    activity_posts = posts[posts[post_id_col].isin(recent_activity)]
-    if activity_posts.empty:
+    if not interest_counts:
         return user_interests
     
-    matches = []
-    for desc in activity_posts[desc_col].dropna():
-        for interest in user_interests:
-            if re.search(interest, str(desc), re.IGNORECASE):
-                matches.append(interest)
-    
-    if not matches:
-        return user_interests
-    
-    from collections import Counter
-    interest_counts = Counter(matches)
     sorted_interests = [interest for interest, _ in interest_counts.most_common()]
     
     if sorted_interests:
@@ -74,118 +80,166 @@ def update_interests(user_interests, recent_activity, posts):
     
     return user_interests
 
-def generate_recommendations(user_id):
-    """Main function to generate recommendations for a user"""
-    # Load data
-    posts = pd.read_csv("posts.csv")
-    users_has_interests = pd.read_csv("users_has_interests.csv")
-    posts_has_likes = pd.read_csv("posts_has_likes.csv")
-    posts_has_comments = pd.read_csv("posts_has_comments.csv")
-    saved_posts = pd.read_csv("saved_posts.csv")
-    
-    # Get user interests
-    top_3_interests = get_or_assign_interests(user_id, users_has_interests)
-    
-    # Get recent activity
-    likes_user_col = find_column(posts_has_likes, ["user", "liked_by"])
-    likes_post_col = find_column(posts_has_likes, ["post", "posts_id"])
-    likes_date_col = find_column(posts_has_likes, ["date", "created"])
-    
-    recent_likes = []
-    if likes_user_col and likes_post_col and likes_date_col:
-        recent_likes = posts_has_likes[
-            (posts_has_likes[likes_user_col] == user_id) & 
-            (pd.to_datetime(posts_has_likes[likes_date_col]) >= datetime.now() - timedelta(days=30))
-        ][likes_post_col].tolist()
-    
-    recent_activity = list(set(recent_likes))
-    
-    # Update interests based on activity
-    user_interests = update_interests(top_3_interests, recent_activity, posts)
+def score_posts(posts, now=None, half_life_days=None, columns=None):
+    """Vectorized engagement, recency and total score arrays for a posts table
+
+    Recency is 1 for posts from the last 7 days and 0.5 otherwise, or a
+    continuous exponential decay when half_life_days is given. Returns None
+    when the posts table lacks the engagement or date columns.
+    """
+    if columns is None:
+        columns = resolve_columns(posts, FEED_SCHEMA["posts"])
+    likes_col = columns["likes"]
+    comments_col = columns["comments"]
+    shares_col = columns["shares"]
+    date_col = columns["created_at"]
     
-    # Filter posts relevant to interests
-    desc_col = find_column(posts, ["desc", "description", "content"]) or posts.columns[0]
-    relevant_posts = posts.copy()
+    if not (likes_col and comments_col and shares_col and date_col):
+        return None
     
-    if desc_col and user_interests:
-        mask = relevant_posts[desc_col].astype(str).str.contains('|'.join(user_interests), case=False, na=False)
-        relevant_posts = relevant_posts[mask].copy()
+    now = np.datetime64(now or datetime.now())
+    engagement_score = (
+        posts[likes_col].to_numpy(dtype=float) / 1000 +
+        posts[comments_col].to_numpy(dtype=float) / 500 +
+        posts[shares_col].to_numpy(dtype=float) / 200
+    )
     
-    # Score posts based on engagement
-    likes_col = find_column(posts, ["likes", "no_of_likes"])
-    comments_col = find_column(posts, ["comments", "no_of_comments"])
-    shares_col = find_column(posts, ["shares", "no_of_shares"])
-    date_col = find_column(posts, ["date", "created_at"])
-    
-    if likes_col and comments_col and shares_col and date_col:
-        relevant_posts["engagement_score"] = (
-            relevant_posts[likes_col] / 1000 + 
-            relevant_posts[comments_col] / 500 + 
-            relevant_posts[shares_col] / 200
-        )
-        relevant_posts["recency_score"] = relevant_posts[date_col].apply(
-            lambda x: 1 if pd.to_datetime(x) >= datetime.now() - timedelta(days=7) else 0.5
-        )
-        relevant_posts["total_score"] = 0.7 * relevant_posts["engagement_score"] + 0.3 * relevant_posts["recency_score"]
+    created_at = as_datetime64(posts[date_col])
+    if half_life_days is None:
+        recency_score = np.where(created_at >= now - np.timedelta64(7, "D"), 1.0, 0.5)
     else:
-        relevant_posts["total_score"] = 1.0
+        age_days = np.clip((now - created_at) / np.timedelta64(1, "D"), 0, None)
+        recency_score = np.nan_to_num(np.exp2(-age_days / half_life_days), nan=0.0)
     
-    # Get top interest-based posts
-    post_id_col = find_column(posts, ["id", "post_id"]) or posts.columns[0]
-    top_interest_posts = relevant_posts.sort_values("total_score", ascending=False).head(50)
+    total_score = 0.7 * engagement_score + 0.3 * recency_score
+    return engagement_score, recency_score, total_score
+
+def top_k(scores, k):
+    """Positions of the k largest scores, best first, without sorting every score"""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def merge_top_k(sources, post_ids, k):
+    """Rows of the k best-scored posts across several (rows, scores) sources
+
+    A post found in more than one source is kept once, with the score from
+    the first source it appears in.
+    """
+    seen = set()
+    candidates = []
+    for rows, scores in sources:
+        for row, post_id, score in zip(rows.tolist(), post_ids[rows].tolist(), scores.tolist()):
+            if post_id not in seen:
+                seen.add(post_id)
+                # The negated position breaks score ties in favour of earlier sources
+                candidates.append((score, -len(candidates), row))
+    best = heapq.nlargest(k, candidates)
+    return np.array([row for _, _, row in best], dtype=np.int64)
+
+def viral_posts(posts, columns, now, k=50):
+    """Rows and scores of the most liked posts of the last 7 days"""
+    likes_col = columns["likes"]
+    date_col = columns["created_at"]
     
-    # Get viral posts (top 50 by engagement)
-    viral_posts = posts.copy()
     if date_col and likes_col:
-        viral_posts = posts[
-            (pd.to_datetime(posts[date_col]) >= datetime.now() - timedelta(days=7))
-        ].sort_values(likes_col, ascending=False).head(50)
+        likes = posts[likes_col].to_numpy()
+        recent = np.flatnonzero(as_datetime64(posts[date_col]) >= np.datetime64(now - timedelta(days=7)))
+        rows = recent[top_k(likes[recent], k)]
     else:
-        viral_posts = posts.head(50)
+        rows = np.arange(min(k, len(posts)))
     
-    # Combine recommendations
-    if not relevant_posts.empty:
-        top_interest_posts["final_score"] = top_interest_posts["total_score"] * 1.5
-        viral_posts["final_score"] = viral_posts[likes_col] if likes_col in viral_posts else 1.0
-        final_recommendations = pd.concat([top_interest_posts, viral_posts]).drop_duplicates(subset=[post_id_col])
-        final_recommendations = final_recommendations.sort_values("final_score", ascending=False).head(100)
-    else:
-        final_recommendations = viral_posts.head(50)
+    scores = posts[likes_col].to_numpy(dtype=float)[rows] if likes_col else np.ones(len(rows))
+    return rows, scores
+
+def post_values(posts, columns):
+    """Arrays of the fields shown for each post, with the usual fallbacks"""
+    n = len(posts)
+    return {
+        "post_id": posts[columns["post_id"] or posts.columns[0]].to_numpy(),
+        "description": posts[columns["description"] or posts.columns[0]].to_numpy(),
+        "likes": posts[columns["likes"]].to_numpy() if columns["likes"] else np.zeros(n, dtype=int),
+        "comments": posts[columns["comments"]].to_numpy() if columns["comments"] else np.zeros(n, dtype=int),
+        "shares": posts[columns["shares"]].to_numpy() if columns["shares"] else np.zeros(n, dtype=int),
+        "created_at": posts[columns["created_at"]].astype(str).to_numpy() if columns["created_at"] else np.full(n, "Unknown date"),
+    }
+
+def format_recommendations(values, rows, user_interests, interest_index):
+    """JSON-ready recommendation entries for the selected rows of post_values"""
+    post_ids = values["post_id"][rows]
+    interest_hits = {interest: interest_index.contains(interest, post_ids) for interest in user_interests}
     
-    # Prepare JSON output
     recommendations = []
-    for _, post in final_recommendations.iterrows():
-        post_id = post[post_id_col]
-        description = post[desc_col] if desc_col in post else "No description available"
-        likes = post[likes_col] if likes_col in post else 0
-        comments = post[comments_col] if comments_col in post else 0
-        shares = post[shares_col] if shares_col in post else 0
-        created_at = post[date_col] if date_col in post else "Unknown date"
-        
+    for n, row in enumerate(rows):
         # Check if post matches interests
-        matches_interests = False
-        matching_interests = []
-        if desc_col and user_interests:
-            for interest in user_interests:
-                if isinstance(description, str) and interest.lower() in description.lower():
-                    matches_interests = True
-                    matching_interests.append(interest)
-        
-        if matches_interests:
+        matching_interests = [interest for interest in user_interests if interest_hits[interest][n]]
+        if matching_interests:
             reason = f"Matches your interests in {', '.join(matching_interests)}"
         else:
             reason = "Popular post with high engagement"
         
         recommendations.append({
-            "post_id": int(post_id),
-            "description": str(description),
-            "likes": int(likes),
-            "comments": int(comments),
-            "shares": int(shares),
-            "created_at": str(created_at),
+            "post_id": int(post_ids[n]),
+            "description": str(values["description"][row]),
+            "likes": int(values["likes"][row]),
+            "comments": int(values["comments"][row]),
+            "shares": int(values["shares"][row]),
+            "created_at": str(values["created_at"][row]),
             "reason": reason,
-            "matches_interests": matches_interests
+            "matches_interests": bool(matching_interests)
         })
+    return recommendations
+
+def generate_recommendations(user_id, store=None, half_life_days=RECENCY_HALF_LIFE_DAYS):
+    """Main function to generate recommendations for a user"""
+    now = datetime.now()
+    
+    # Load data (once per process, see FeedStore)
+    if store is None:
+        store = get_default_store()
+    # One snapshot for the whole call, a concurrent reload cannot mix tables and indexes
+    data = store.snapshot
+    posts = data.posts
+    interest_index = data.interest_index
+    columns = data.schema["posts"]
+    
+    # Get user interests
+    top_3_interests = assign_interests(data.user_interests(user_id), data.interest_popularity)
+    
+    # Get recent activity
+    recent_likes = data.user_likes(user_id, since=now - timedelta(days=30))
+    recent_activity = list(set(recent_likes.tolist()))
+    
+    # Update interests based on activity
+    activity_counts = store.activity.counts(user_id, now)
+    user_interests = update_interests(top_3_interests, recent_activity, posts, interest_index, activity_counts)
+    
+    # Filter posts relevant to interests
+    post_ids = posts[columns["post_id"] or posts.columns[0]].to_numpy()
+    if user_interests:
+        relevant = np.flatnonzero(np.isin(post_ids, interest_index.posts_matching(user_interests)))
+    else:
+        relevant = np.arange(len(posts))
+    
+    # Score posts based on engagement
+    scores = score_posts(posts.iloc[relevant], now, half_life_days, columns)
+    total_score = scores[2] if scores is not None else np.ones(len(relevant))
+    
+    # Get top interest-based posts and viral posts (top 50 by likes)
+    top = top_k(total_score, 50)
+    viral_rows, viral_scores = viral_posts(posts, columns, now)
+    
+    # Combine recommendations
+    if len(relevant):
+        selected = merge_top_k([(relevant[top], total_score[top] * 1.5), (viral_rows, viral_scores)], post_ids, 100)
+    else:
+        selected = viral_rows[:50]
+    
+    # Prepare JSON output
+    values = post_values(posts.iloc[selected], columns)
+    recommendations = format_recommendations(values, np.arange(len(selected)), user_interests, interest_index)
     
     return {
         "user_id": user_id,
@@ -194,6 +248,69 @@ def generate_recommendations(user_id):
         "count": len(recommendations)
     }
 
+def interest_match_matrix(interest_index, post_ids, interests):
+    """Boolean post-by-interest matrix telling which posts mention which interests"""
+    matrix = np.zeros((len(post_ids), len(interests)), dtype=bool)
+    for j, interest in enumerate(interests):
+        matrix[:, j] = interest_index.contains(interest, post_ids)
+    return matrix
+
+def generate_recommendations_batch(user_ids, store=None, half_life_days=RECENCY_HALF_LIFE_DAYS):
+    """Generate recommendations for many users, computing the shared per-post work once"""
+    if store is None:
+        store = get_default_store()
+    # One snapshot for the whole call, a concurrent reload cannot mix tables and indexes
+    data = store.snapshot
+    posts = data.posts
+    interest_index = data.interest_index
+    columns = data.schema["posts"]
+    now = datetime.now()
+
+    # Resolve interests first so the interest vocabulary is known up front
+    user_interests = {}
+    for user_id in user_ids:
+        top_3_interests = assign_interests(data.user_interests(user_id), data.interest_popularity)
+        recent_activity = list(set(data.user_likes(user_id, since=now - timedelta(days=30)).tolist()))
+        activity_counts = store.activity.counts(user_id, now)
+        user_interests[user_id] = update_interests(top_3_interests, recent_activity, posts, interest_index, activity_counts)
+
+    vocabulary = sorted({interest for interests in user_interests.values() for interest in interests})
+    column_of = {interest: j for j, interest in enumerate(vocabulary)}
+
+    values = post_values(posts, columns)
+    matches = interest_match_matrix(interest_index, values["post_id"], vocabulary)
+
+    # Per-post scores and viral posts are the same for every user
+    scores = score_posts(posts, now, half_life_days, columns)
+    total_score = scores[2] if scores is not None else np.ones(len(posts))
+    viral_rows, viral_scores = viral_posts(posts, columns, now)
+
+    results = {}
+    for user_id in user_ids:
+        interests = user_interests[user_id]
+        interest_cols = [column_of[interest] for interest in interests]
+
+        if interest_cols:
+            relevant = np.flatnonzero(matches[:, interest_cols].any(axis=1))
+        else:
+            relevant = np.arange(len(posts))
+
+        if len(relevant):
+            top = relevant[top_k(total_score[relevant], 50)]
+            selected = merge_top_k([(top, total_score[top] * 1.5), (viral_rows, viral_scores)], values["post_id"], 100)
+        else:
+            selected = viral_rows[:50]
+
+        recommendations = format_recommendations(values, selected, interests, interest_index)
+        results[user_id] = {
+            "user_id": user_id,
+            "interests": interests,
+            "recommendations": recommendations,
+            "count": len(recommendations)
+        }
+
+    return results
+
 # Example usage
 if __name__ == "__main__":
     user_id = 4  # Change this to the desired user ID
@@ -0,0 +1,188 @@
+"""Versioned on-disk format for the certificate model.
+
+An artifact is a directory holding manifest.json plus plain NumPy arrays
+(.npy) that are loaded with mmap_mode="r", so forked server workers share
+the same read-only pages instead of each unpickling its own copy. The TF-IDF
+vocabulary and idf weights are stored as arrays and applied by
+ArtifactVectorizer, and the forest is stored flattened and evaluated by
+FlatForest, so serving needs neither sklearn nor a pickle. model.joblib
+keeps the full sklearn estimator for inspection and retraining.
+
+Usage: python model_artifact.py [certificate_classifier.pkl vectorizer.pkl [model_artifact]]
+converts the pickled model and vectorizer into an artifact directory.
+"""
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+from flat_forest import FlatForest, flatten_forest
+
+# Version 2 added the flattened forest arrays
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+MANIFEST_NAME = "manifest.json"
+ARTIFACT_DIR = "model_artifact"
+
+
+class ArtifactVectorizer:
+    """TF-IDF transform (word unigrams) from a stored vocabulary and idf array.
+
+    Reproduces TfidfVectorizer.transform for the options it was exported with.
+    """
+
+    def __init__(self, vocabulary, idf, lowercase=True, token_pattern=r"(?u)\b\w\w+\b",
+                 norm="l2", sublinear_tf=False):
+        self.terms = vocabulary
+        self.vocabulary_ = {term: i for i, term in enumerate(vocabulary.tolist())}
+        self.idf_ = idf
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self._token_re = re.compile(token_pattern)
+
+    def transform(self, texts):
+        """CSR matrix of l2-normalized TF-IDF rows, one per text."""
+        indptr, indices, counts = [0], [], []
+        for text in texts:
+            if self.lowercase:
+                text = text.lower()
+            row = Counter(self.vocabulary_[token] for token in self._token_re.findall(text)
+                          if token in self.vocabulary_)
+            indices.extend(row.keys())
+            counts.extend(row.values())
+            indptr.append(len(indices))
+
+        X = sp.csr_matrix((np.array(counts, dtype=np.float64), np.array(indices, dtype=np.int32), indptr),
+                          shape=(len(indptr) - 1, len(self.terms)))
+        X.sort_indices()
+        if self.sublinear_tf:
+            X.data = np.log(X.data) + 1
+        X.data *= self.idf_[X.indices]
+        if self.norm == "l2":
+            norms = np.sqrt(np.bincount(np.repeat(np.arange(X.shape[0]), np.diff(X.indptr)),
+                                        weights=X.data ** 2, minlength=X.shape[0]))
+            X.data /= np.repeat(np.where(norms > 0, norms, 1), np.diff(X.indptr))
+        return X
+
+
+def _check_vectorizer(vectorizer):
+    unsupported = {
+        "analyzer": (vectorizer.analyzer, "word"),
+        "ngram_range": (tuple(vectorizer.ngram_range), (1, 1)),
+        "tokenizer": (vectorizer.tokenizer, None),
+        "preprocessor": (vectorizer.preprocessor, None),
+        "stop_words": (vectorizer.stop_words, None),
+        "strip_accents": (vectorizer.strip_accents, None),
+        "use_idf": (vectorizer.use_idf, True),
+        "binary": (vectorizer.binary, False),
+        "dtype": (np.dtype(vectorizer.dtype), np.dtype(np.float64)),
+        "norm": (vectorizer.norm in ("l2", None), True),
+    }
+    for option, (value, expected) in unsupported.items():
+        if value != expected:
+            raise ValueError(f"Cannot export a vectorizer with {option}={value!r}")
+
+
+def save_artifact(model, vectorizer, path=ARTIFACT_DIR, numeric_features=("text_length", "word_count")):
+    """Write the model and fitted vectorizer as a versioned artifact directory."""
+    import joblib
+
+    _check_vectorizer(vectorizer)
+    vocabulary = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, index in vectorizer.vocabulary_.items():
+        vocabulary[index] = term
+
+    # Written next to the target, then swapped in so readers never see a half-written artifact
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "vocabulary.npy"), vocabulary.astype(str))
+    np.save(os.path.join(tmp_path, "idf.npy"), vectorizer.idf_.astype(np.float64))
+    joblib.dump(model, os.path.join(tmp_path, "model.joblib"))
+    forest = flatten_forest(model)
+    for name in FOREST_ARRAYS:
+        np.save(os.path.join(tmp_path, f"forest_{name}.npy"), forest[name])
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "classes": [str(c) for c in model.classes_],
+        "n_features": int(model.n_features_in_),
+        "numeric_features": list(numeric_features),
+        "forest_max_depth": forest["max_depth"],
+        "vectorizer": {
+            "lowercase": vectorizer.lowercase,
+            "token_pattern": vectorizer.token_pattern,
+            "norm": vectorizer.norm,
+            "sublinear_tf": vectorizer.sublinear_tf,
+        },
+        "files": dict({"vocabulary": "vocabulary.npy", "idf": "idf.npy", "model": "model.joblib"},
+                      **{f"forest_{name}": f"forest_{name}.npy" for name in FOREST_ARRAYS}),
+    }
+    with open(os.path.join(tmp_path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def load_manifest(path=ARTIFACT_DIR):
+    """Read and check an artifact's manifest."""
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported model artifact version {manifest.get('format_version')} in {path}")
+    return manifest
+
+
+def load_vectorizer(path=ARTIFACT_DIR, manifest=None):
+    """ArtifactVectorizer backed by the memory-mapped vocabulary and idf arrays."""
+    manifest = manifest or load_manifest(path)
+    files = manifest["files"]
+    return ArtifactVectorizer(
+        np.load(os.path.join(path, files["vocabulary"]), mmap_mode="r"),
+        np.load(os.path.join(path, files["idf"]), mmap_mode="r"),
+        **manifest["vectorizer"]
+    )
+
+
+def load_forest(path=ARTIFACT_DIR, manifest=None):
+    """FlatForest backed by the memory-mapped forest arrays."""
+    manifest = manifest or load_manifest(path)
+    arrays = {name: np.load(os.path.join(path, manifest["files"][f"forest_{name}"]), mmap_mode="r")
+              for name in FOREST_ARRAYS}
+    arrays["max_depth"] = manifest["forest_max_depth"]
+    return FlatForest(arrays, manifest["classes"], manifest["n_features"])
+
+
+def load_artifact(path=ARTIFACT_DIR):
+    """(model, vectorizer, manifest) from an artifact directory.
+
+    The model is a FlatForest when the artifact has the flattened arrays,
+    otherwise (version 1) the sklearn estimator from model.joblib.
+    """
+    manifest = load_manifest(path)
+    if "forest_feature" in manifest["files"]:
+        model = load_forest(path, manifest)
+    else:
+        import joblib
+
+        model = joblib.load(os.path.join(path, manifest["files"]["model"]), mmap_mode="r")
+    return model, load_vectorizer(path, manifest), manifest
+
+
+if __name__ == "__main__":
+    import pickle
+
+    model_path, vectorizer_path = sys.argv[1:3] if len(sys.argv) > 2 else ("certificate_classifier.pkl", "vectorizer.pkl")
+    artifact_path = sys.argv[3] if len(sys.argv) > 3 else ARTIFACT_DIR
+    with open(model_path, "rb") as model_file, open(vectorizer_path, "rb") as vectorizer_file:
+        save_artifact(pickle.load(model_file), pickle.load(vectorizer_file), artifact_path)
+    print(f"Model artifact written to {artifact_path}")
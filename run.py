@@ -1,73 +1,115 @@
+import argparse
+import json
+import os
+import numpy as np
 import pandas as pd
 import networkx as nx
+import matplotlib
+from table_cache import load_table
+from student_graph import (candidate_recall, edge_file_adjacency, lsh_candidates, read_edge_file,
+                           recommend_friends, write_edge_file, write_peer_edge_file)
+
+parser = argparse.ArgumentParser(description="Student similarity graph and friend recommendations")
+parser.add_argument("--min-weight", type=int, default=1, help="Minimum number of shared attributes for an edge")
+parser.add_argument("--edge-file", default="student_edges.bin", help="Binary edge file (int32 src, int32 dst, uint8 weight)")
+parser.add_argument("--approx-peers", type=int, default=0,
+                    help="Link each student only to ~K most similar peers found by MinHash LSH instead of scoring all pairs")
+parser.add_argument("--headless", action="store_true",
+                    help="Never open a window; write the plot and results to --output-dir (default: graph_output)")
+parser.add_argument("--plot-nodes", type=int, default=200,
+                    help="Plot only the N students with the highest total edge weight (0 skips plotting)")
+parser.add_argument("--output-dir", help="Write nodes/edges (Parquet), recommendations (JSON) and the plotted subgraph (GraphML) here")
+args = parser.parse_args()
+
+if args.headless:
+    matplotlib.use("Agg")
+    # Headless runs exist to produce files, so they always have somewhere to write them
+    args.output_dir = args.output_dir or "graph_output"
 import matplotlib.pyplot as plt
-from collections import defaultdict
-from joblib import Parallel, delayed
+
+if args.output_dir:
+    os.makedirs(args.output_dir, exist_ok=True)
 
 # Sample DataFrame (Replace this with your CSV file reading)
-data = pd.read_csv('data.csv', names=['Name', 'City', 'College', 'Age', 'Branch', 'Degree', 'Year', 'Gender', 'Hometown'])
+# header=0 replaces the file's own header row instead of reading it as a student
+data = load_table('data.csv', names=['Name', 'City', 'College', 'Age', 'Branch', 'Degree', 'Year', 'Gender', 'Hometown'], header=0)
 
 print("Data Loaded Successfully")
 print(data.head())
 
-# Build Graph
-G = nx.Graph()
-similarity_weights = defaultdict(int)
-
-# Add nodes
-for _, row in data.iterrows():
-    G.add_node(row['Name'], **row.to_dict())
-
-print(f"Added {len(G.nodes())} nodes to the graph")
-
-# Parallel edge creation
-def compute_edges(i, student1):
-    edges = []
-    for j, student2 in data.iterrows():
-        if i >= j:
-            continue
-        common_attributes = sum(
-            student1[attr] == student2[attr] for attr in ['City', 'College', 'Branch', 'Degree', 'Year', 'Hometown']
-        )
-        if common_attributes > 0:
-            edges.append((student1['Name'], student2['Name'], common_attributes))
-    return edges
-
-# Use parallel processing
-results = Parallel(n_jobs=-1)(delayed(compute_edges)(i, student1) for i, student1 in data.iterrows())
-
-# Flatten results and add edges to the graph
-for edge_list in results:
-    for u, v, weight in edge_list:
-        G.add_edge(u, v, weight=weight)
-        similarity_weights[(u, v)] = weight
-
-print(f"Added {len(G.edges())} edges to the graph")
-
-# Visualization
-pos = nx.spring_layout(G, seed=42)
-weights = [G[u][v]['weight'] for u, v in G.edges()]
-nx.draw(G, pos, with_labels=True, node_color='lightblue', edge_color=weights, width=2, cmap=plt.cm.Blues, node_size=500)
-nx.draw_networkx_edge_labels(G, pos, edge_labels={(u, v): G[u][v]['weight'] for u, v in G.edges()})
-plt.title('Student Network Graph')
-plt.show()
-
-# Friend Recommendation
-recommendations = {}
-
-for node in G.nodes():
-    neighbors = set(G.neighbors(node))
-    potential_friends = set(G.nodes()) - neighbors - {node}
-
-    recommendations[node] = sorted(
-        [(friend, sum(G[node][neighbor]['weight'] for neighbor in G.neighbors(node) if G.has_edge(friend, neighbor)))
-         for friend in potential_friends],
-        key=lambda x: x[1], reverse=True
+if args.approx_peers:
+    # Approximate edges: top-k peers per student from LSH candidates, with recall reported
+    peers, peer_weights = lsh_candidates(data, k=args.approx_peers)
+    print(f"LSH candidate recall@{args.approx_peers} against exact weights: {candidate_recall(data, peers):.3f}")
+    edge_count = write_peer_edge_file(peers, peer_weights, args.edge_file, min_weight=args.min_weight)
+else:
+    # Edge creation: shared-attribute counts from sparse one-hot products, streamed to
+    # disk block by block and keeping only pairs that share at least --min-weight attributes
+    edge_count = write_edge_file(data, args.edge_file, min_weight=args.min_weight)
+print(f"Wrote {edge_count} edges to {args.edge_file}")
+
+adjacency = edge_file_adjacency(args.edge_file, len(data))
+names = data['Name'].astype(str).tolist()
+
+# Visualization of the heaviest students only: a spring layout of the whole graph is O(n^2) per iteration
+if args.plot_nodes > 0:
+    strength = np.asarray(adjacency.sum(axis=1)).ravel()
+    nodes = np.sort(np.argsort(-strength, kind="stable")[:args.plot_nodes])
+    sub = adjacency[nodes][:, nodes].tocoo()
+
+    # Nodes keyed by row, since several students share a name
+    G = nx.Graph()
+    for i in nodes.tolist():
+        G.add_node(i, **{key: str(value) for key, value in data.iloc[i].items()})
+    G.add_weighted_edges_from(
+        (int(nodes[u]), int(nodes[v]), int(w)) for u, v, w in zip(sub.row, sub.col, sub.data) if u < v
     )
+    print(f"Plotting {len(G.nodes())} of {len(data)} students and {len(G.edges())} edges")
+
+    pos = nx.spring_layout(G, seed=42)
+    weights = [G[u][v]['weight'] for u, v in G.edges()]
+    nx.draw(G, pos, labels=nx.get_node_attributes(G, 'Name'), node_color='lightblue', edge_color=weights, width=2, cmap=plt.cm.Blues, node_size=500)
+    if len(G.edges()) <= 500:
+        nx.draw_networkx_edge_labels(G, pos, edge_labels={(u, v): G[u][v]['weight'] for u, v in G.edges()})
+    plt.title('Student Network Graph')
+
+    if args.output_dir:
+        plt.savefig(os.path.join(args.output_dir, "student_graph.png"), dpi=150)
+        nx.write_graphml(G, os.path.join(args.output_dir, "student_graph.graphml"))
+    if not args.headless:
+        plt.show()
+    plt.close()
+
+# Friend Recommendation: weighted common-neighbour scores over the CSR adjacency
+friends, scores = recommend_friends(adjacency, k=5)
 
 # Display Recommendations
-for student, recs in recommendations.items():
-    top_recs = [f"{friend} (Score: {score})" for friend, score in recs[:5] if score > 0]
-    print(f"{student}'s Recommended Friends: {', '.join(top_recs) if top_recs else 'No strong matches'}")
+for student in range(len(data)):
+    top_recs = [f"{names[friend]} #{friend} (Score: {score})"
+                for friend, score in zip(friends[student].tolist(), scores[student].tolist()) if score > 0]
+    print(f"{names[student]} #{student}'s Recommended Friends: {', '.join(top_recs) if top_recs else 'No strong matches'}")
+
+if args.output_dir:
+    edges = read_edge_file(args.edge_file)
+    try:
+        data.to_parquet(os.path.join(args.output_dir, "students.parquet"))
+        pd.DataFrame({key: np.asarray(edges[key]) for key in ('src', 'dst', 'weight')}).to_parquet(
+            os.path.join(args.output_dir, "edges.parquet"))
+    except ImportError:
+        print("pyarrow is not installed, skipping the Parquet export (edges remain in the binary edge file)")
+
+    with open(os.path.join(args.output_dir, "recommendations.json"), "w") as out:
+        json.dump([
+            {
+                "student": student,
+                "name": names[student],
+                "recommendations": [
+                    {"student": friend, "name": names[friend], "score": score}
+                    for friend, score in zip(friends[student].tolist(), scores[student].tolist()) if score > 0
+                ],
+            }
+            for student in range(len(data))
+        ], out)
+    print(f"Graph and recommendations written to {args.output_dir}")
 
 print("Recommendation System Execution Completed")
@@ -0,0 +1,257 @@
+"""Sparse building blocks for the student similarity graph used by run.py.
+
+Students are rows of the data.csv table and are identified by row position
+(names are not unique). Two students are linked with a weight equal to the
+number of attributes they share.
+"""
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+ATTRIBUTES = ['City', 'College', 'Branch', 'Degree', 'Year', 'Hometown']
+
+# On-disk edge record: 9 bytes per edge, no padding
+EDGE_DTYPE = np.dtype([('src', '<i4'), ('dst', '<i4'), ('weight', 'u1')])
+
+
+def encode_attributes(data, attributes=ATTRIBUTES):
+    """Integer-code each attribute column; missing values get code -1."""
+    return np.column_stack([pd.factorize(data[attr])[0] for attr in attributes]).astype(np.int32)
+
+
+def one_hot_attributes(data, attributes=ATTRIBUTES):
+    """Sparse student x (attribute, value) indicator matrix."""
+    codes = encode_attributes(data, attributes)
+    n = len(codes)
+    blocks = []
+    for j in range(codes.shape[1]):
+        valid = codes[:, j] >= 0
+        width = codes[:, j].max() + 1 if n else 0
+        blocks.append(sp.csr_matrix(
+            (np.ones(valid.sum(), dtype=np.uint8), (np.flatnonzero(valid), codes[valid, j])),
+            shape=(n, width)
+        ))
+    return sp.hstack(blocks, format="csr", dtype=np.uint8)
+
+
+def shared_attribute_blocks(data, attributes=ATTRIBUTES, block_size=2048):
+    """Yield (start, weights) for row blocks of the upper-triangular shared-attribute matrix.
+
+    weights is a CSR matrix of shape (block rows, n) where entry (i, j) counts
+    the attributes shared by students start + i and j, kept only for j > start + i.
+    Only pairs that share at least one attribute bucket are ever touched.
+    """
+    onehot = one_hot_attributes(data, attributes)
+    onehot_t = onehot.T.tocsr()
+    n = onehot.shape[0]
+    for start in range(0, n, block_size):
+        block = onehot[start:start + block_size] @ onehot_t
+        yield start, sp.triu(block, k=start + 1, format="csr")
+
+
+def build_edges(data, attributes=ATTRIBUTES, block_size=2048):
+    """Upper-triangular CSR matrix of shared-attribute counts between students."""
+    blocks = [weights for _, weights in shared_attribute_blocks(data, attributes, block_size)]
+    if not blocks:
+        return sp.csr_matrix((0, 0), dtype=np.uint8)
+    return sp.vstack(blocks, format="csr")
+
+
+def write_edge_file(data, path, min_weight=1, attributes=ATTRIBUTES, block_size=2048):
+    """Stream edges with weight >= min_weight to a binary edge file, one row block at a time.
+
+    Returns the number of edges written. Memory stays bounded by a single block.
+    """
+    count = 0
+    with open(path, "wb") as out:
+        for start, weights in shared_attribute_blocks(data, attributes, block_size):
+            weights.data[weights.data < min_weight] = 0
+            weights.eliminate_zeros()
+            block = weights.tocoo()
+            count += _write_edges(out, block.row + start, block.col, block.data)
+    return count
+
+
+def _write_edges(out, src, dst, weight):
+    chunk = np.empty(len(src), dtype=EDGE_DTYPE)
+    chunk['src'] = src
+    chunk['dst'] = dst
+    chunk['weight'] = weight
+    chunk.tofile(out)
+    return len(chunk)
+
+
+def read_edge_file(path):
+    """Memory-map a binary edge file as a structured (src, dst, weight) array."""
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=EDGE_DTYPE)
+    return np.memmap(path, dtype=EDGE_DTYPE, mode="r")
+
+
+def edge_file_adjacency(path, n):
+    """Symmetric CSR adjacency of n students from a binary edge file."""
+    edges = read_edge_file(path)
+    upper = sp.coo_matrix((edges['weight'], (edges['src'], edges['dst'])), shape=(n, n))
+    return symmetric_adjacency(upper)
+
+
+def symmetric_adjacency(upper):
+    """Full symmetric CSR adjacency from an upper-triangular weight matrix."""
+    upper = sp.csr_matrix(upper)
+    return (upper + upper.T).tocsr()
+
+
+def recommend_friends(adjacency, k=5, block_size=512, dense_threshold=0.01):
+    """Top-k friend-of-friend suggestions for every student.
+
+    The score of a non-neighbour f for student u is the total weight of u's
+    edges to neighbours that f is also linked to, i.e. row u of W @ B with W
+    the weighted and B the binary adjacency. Rows are processed in blocks so
+    memory stays around block_size x n scores plus the k best per row. Blocks
+    denser than dense_threshold are multiplied as dense float32 tiles (BLAS),
+    sparser ones as CSR products.
+    Returns (friends, scores) arrays of shape (n, k); empty slots hold -1 / 0.
+    """
+    weights = sp.csr_matrix(adjacency, dtype=np.float32)
+    linked = weights.copy()
+    linked.data[:] = 1
+    linked_columns = linked.tocsc()
+    n = weights.shape[0]
+    k = min(k, n)
+
+    friends = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.int64)
+    for start in range(0, n, block_size):
+        rows = weights[start:start + block_size]
+        local = np.arange(rows.shape[0])
+
+        if rows.nnz > dense_threshold * rows.shape[0] * n:
+            dense_rows = rows.toarray()
+            block = np.empty((len(local), n), dtype=np.float32)
+            for col in range(0, n, block_size):
+                block[:, col:col + block_size] = dense_rows @ linked_columns[:, col:col + block_size].toarray()
+        else:
+            block = (rows @ linked).toarray()
+
+        # Existing friends and the student themself are not suggestions
+        block[np.repeat(local, np.diff(rows.indptr)), rows.indices] = 0
+        block[local, local + start] = 0
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (len(local), 1))
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.rint(np.take_along_axis(top_scores, order, axis=1)).astype(np.int64)
+
+        top[top_scores <= 0] = -1
+        friends[start:start + len(local)] = top
+        scores[start:start + len(local)] = np.maximum(top_scores, 0)
+    return friends, scores
+
+
+def minhash_signatures(codes, num_perm=32, seed=42):
+    """MinHash signatures (n x num_perm) of each student's set of (attribute, value) tokens."""
+    widths = codes.max(axis=0) + 1 if len(codes) else np.zeros(codes.shape[1], dtype=np.int32)
+    offsets = np.concatenate([[0], np.cumsum(widths)[:-1]])
+    # Missing values map to a trailing sentinel token that never wins the minimum
+    tokens = np.where(codes >= 0, codes + offsets, widths.sum())
+
+    rng = np.random.default_rng(seed)
+    signatures = np.empty((len(codes), num_perm), dtype=np.int64)
+    for p in range(num_perm):
+        ranks = np.append(rng.permutation(widths.sum()), np.iinfo(np.int64).max)
+        signatures[:, p] = ranks[tokens].min(axis=1)
+    return signatures
+
+
+def _keep_top_k(src, dst, weight, n, k):
+    """Keep the k heaviest (dst, weight) entries per src."""
+    # One sort key: by src, then heaviest first, then by dst
+    order = np.argsort((src * 256 + (255 - weight.astype(np.int64))) * n + dst)
+    src, dst, weight = src[order], dst[order], weight[order]
+    starts = np.flatnonzero(np.r_[True, src[1:] != src[:-1]])
+    rank = np.arange(len(src)) - np.repeat(starts, np.diff(np.r_[starts, len(src)]))
+    keep = rank < k
+    return src[keep], dst[keep], weight[keep]
+
+
+def lsh_candidates(data, k=10, attributes=ATTRIBUTES, num_perm=32, bands=16, window=8, seed=42):
+    """Approximate top-k most similar peers of every student without scoring all pairs.
+
+    Students whose MinHash signatures agree on a whole band share a bucket.
+    Inside a bucket (shuffled per band) each student is only paired with the
+    next `window` members, so huge buckets such as "same Year" cost O(window)
+    per student instead of O(bucket). Candidate pairs are then weighted
+    exactly (shared attribute count) and the k heaviest kept per student.
+    Returns (peers, weights) arrays of shape (n, k); empty slots hold -1 / 0.
+    """
+    codes = encode_attributes(data, attributes)
+    n = len(codes)
+    signatures = minhash_signatures(codes, num_perm, seed)
+    rows_per_band = num_perm // bands
+    rng = np.random.default_rng(seed)
+
+    src = dst = np.empty(0, dtype=np.int64)
+    for b in range(bands):
+        band = signatures[:, b * rows_per_band:(b + 1) * rows_per_band]
+        order = np.lexsort((rng.random(n),) + tuple(band.T[::-1]))
+        sorted_band = band[order]
+
+        new_src, new_dst = [src], [dst]
+        for offset in range(1, window + 1):
+            same = (sorted_band[offset:] == sorted_band[:-offset]).all(axis=1)
+            a, c = order[:-offset][same], order[offset:][same]
+            new_src += [a, c]
+            new_dst += [c, a]
+        cand_src, cand_dst = np.concatenate(new_src), np.concatenate(new_dst)
+
+        # Drop repeated pairs, weight the new ones exactly, keep the best k per student
+        pair_ids = np.sort(cand_src * n + cand_dst)
+        pair_ids = pair_ids[np.r_[True, pair_ids[1:] != pair_ids[:-1]]]
+        cand_src, cand_dst = pair_ids // n, pair_ids % n
+        cand_weight = ((codes[cand_src] == codes[cand_dst]) & (codes[cand_src] >= 0)).sum(axis=1).astype(np.uint8)
+        src, dst, weight = _keep_top_k(cand_src, cand_dst, cand_weight, n, k)
+
+    peers = np.full((n, k), -1, dtype=np.int64)
+    weights = np.zeros((n, k), dtype=np.uint8)
+    starts = np.searchsorted(src, np.arange(n))
+    slot = np.arange(len(src)) - starts[src]
+    peers[src, slot] = dst
+    weights[src, slot] = weight
+    return peers, weights
+
+
+def candidate_recall(data, peers, attributes=ATTRIBUTES, sample=1000, seed=42):
+    """Share of the returned peers that belong to the exact top-k by shared-attribute count.
+
+    A peer counts as correct when its exact weight (as compute_edges defined it)
+    reaches the k-th best exact weight of that student, so ties are not
+    penalised. Evaluated on a random sample of students.
+    """
+    codes = encode_attributes(data, attributes)
+    n, k = peers.shape
+    rng = np.random.default_rng(seed)
+    students = rng.choice(n, size=min(sample, n), replace=False)
+
+    recalls = []
+    for student in students:
+        exact = ((codes == codes[student]) & (codes >= 0)).sum(axis=1)
+        exact[student] = -1
+        kth_best = np.partition(exact, n - k)[n - k] if k < n else exact.min()
+        found = peers[student][peers[student] >= 0]
+        recalls.append(np.sum(exact[found] >= max(kth_best, 1)) / k)
+    return float(np.mean(recalls))
+
+
+def write_peer_edge_file(peers, weights, path, min_weight=1):
+    """Write the (deduplicated, undirected) peer lists as a binary edge file."""
+    n, k = peers.shape
+    src = np.repeat(np.arange(n), k)
+    dst = peers.ravel()
+    weight = weights.ravel()
+    keep = (dst >= 0) & (weight >= min_weight)
+    low, high = np.minimum(src, dst)[keep], np.maximum(src, dst)[keep]
+    pair_ids, first = np.unique(low.astype(np.int64) * n + high, return_index=True)
+    with open(path, "wb") as out:
+        return _write_edges(out, pair_ids // n, pair_ids % n, weight[keep][first])
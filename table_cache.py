@@ -0,0 +1,91 @@
+"""Columnar binary cache for the CSV tables.
+
+The first load of a CSV normalizes it once (padding stripped, dates parsed,
+integers narrowed, repetitive text such as interests, cities and colleges
+encoded as categoricals) and writes a Feather copy under .table_cache/.
+Later loads memory-map that copy instead of parsing text. pyarrow is
+optional; without it every load parses the CSV.
+
+Usage: python table_cache.py posts.csv users_has_interests.csv ...
+"""
+import hashlib
+import os
+import sys
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional, fall back to parsing the CSV
+    feather = None
+
+CACHE_DIR = ".table_cache"
+
+# Bump when normalization changes so old cache files are not reused
+CACHE_FORMAT = 1
+
+# Columns whose name contains one of these are parsed as datetimes
+DATE_HINTS = ("date", "created", "modified")
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORICAL_RATIO = 0.5
+
+
+def read_table(path, names=None, header="infer"):
+    """Read a CSV table with clean column names and values, compact integers and parsed dates."""
+    df = pd.read_csv(path, names=names, header=header, skipinitialspace=True)
+    df.columns = [str(col).strip() for col in df.columns]
+
+    for col in df.columns:
+        if any(hint in col.lower() for hint in DATE_HINTS):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif pd.api.types.is_integer_dtype(df[col]):
+            if df.empty or df[col].abs().max() < 2 ** 31:
+                df[col] = df[col].astype("int32")
+        elif pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].str.strip()
+            if len(df) and df[col].nunique() <= CATEGORICAL_RATIO * len(df):
+                df[col] = df[col].astype("category")
+    return df
+
+
+def cache_path(path, names=None, header="infer", cache_dir=None):
+    """Location of the cached copy of a CSV for its current size, mtime and read options."""
+    stat = os.stat(path)
+    key = repr((CACHE_FORMAT, stat.st_size, stat.st_mtime_ns, names, header))
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{digest}.feather")
+
+
+def load_table(path, names=None, header="infer", cache_dir=None):
+    """Load a normalized CSV table, from the binary cache when it is up to date."""
+    if feather is None:
+        return read_table(path, names, header)
+
+    cached = cache_path(path, names, header, cache_dir)
+    if os.path.exists(cached):
+        return feather.read_feather(cached, memory_map=True)
+
+    df = read_table(path, names, header)
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+
+    # Drop stale copies of the same table, then write atomically. Another process may be
+    # building the same cache, so the current copy is kept and files it removed first are fine
+    prefix = os.path.basename(path) + "."
+    for name in os.listdir(os.path.dirname(cached)):
+        stale = os.path.join(os.path.dirname(cached), name)
+        if name.startswith(prefix) and name.endswith(".feather") and stale != cached:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+    tmp_path = f"{cached}.{os.getpid()}.tmp"
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cached)
+    return df
+
+
+if __name__ == "__main__":
+    for csv_path in sys.argv[1:]:
+        table = load_table(csv_path)
+        print(f"{csv_path}: {len(table)} rows cached at {cache_path(csv_path)}")
@@ -0,0 +1,203 @@
+"""Text extraction from certificate files (PDF or image), shared by training and serving.
+
+PDF pages are read from their text layer, and pages without one fall back
+to OCR of their embedded images. Long PDFs are split into page ranges
+extracted in parallel. A top-level process runs them on a process pool.
+Inside another pool's worker (a verification job, /batch or
+prepare_dataset) they run on threads instead, since such workers cannot
+start processes of their own; OCR still runs in parallel there, as each
+page is recognized by a separate tesseract process.
+
+Images are converted to grayscale, downscaled and binarized before
+Tesseract sees them. Extraction stops once max_chars characters are
+collected. A source is either a file path or the file's bytes (e.g. an
+upload kept in memory), in which case pass its filename so the type can
+be told. Pass a dict as `timings` to get the seconds spent in each stage
+(pdf_text, ocr_preprocess, ocr, total). With strict=True failures raise
+ExtractionError instead of yielding empty text, so callers such as the
+extraction cache can tell them from blank files.
+
+PyPDF2, PIL and pytesseract are imported on first use.
+"""
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Bump whenever extraction output changes, cached texts are keyed on it
+EXTRACTOR_VERSION = "2"
+
+# Stop after this many characters (None extracts everything)
+MAX_CHARS = int(os.environ.get("CERT_MAX_CHARS", 0)) or None
+
+# PDFs with at least this many pages are extracted by PAGE_WORKERS processes (threads inside a worker)
+PARALLEL_MIN_PAGES = int(os.environ.get("CERT_PARALLEL_MIN_PAGES", 8))
+PAGE_WORKERS = int(os.environ.get("CERT_PAGE_WORKERS", min(4, os.cpu_count() or 1)))
+
+# OCR input: longest side in pixels, images above are downscaled
+OCR_MAX_SIDE = 2000
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+class ExtractionError(Exception):
+    """A file's text could not be extracted (unreadable file, OCR backend missing, ...)."""
+
+
+def extractor_version(max_chars=MAX_CHARS):
+    """Cache version string covering the extractor and its character limit."""
+    return f"{EXTRACTOR_VERSION}-{max_chars or 'all'}"
+
+
+def _add_timing(timings, stage, seconds):
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def otsu_threshold(histogram):
+    """Gray level that best separates dark and light pixels of a 256-bin histogram."""
+    import numpy as np
+
+    histogram = np.asarray(histogram, dtype=np.float64)
+    levels = np.arange(256)
+    weight_dark = np.cumsum(histogram)
+    weight_light = weight_dark[-1] - weight_dark
+    sum_dark = np.cumsum(histogram * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    between = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(np.argmax(between))
+
+
+def preprocess_image(image, max_side=OCR_MAX_SIDE):
+    """Grayscale, downscaled and binarized copy of an image, ready for OCR."""
+    from PIL import Image
+
+    image = image.convert("L")
+    if max(image.size) > max_side:
+        scale = max_side / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.LANCZOS)
+    threshold = otsu_threshold(image.histogram())
+    return image.point(lambda value: 255 if value > threshold else 0, mode="1")
+
+
+def ocr_image(image, timings=None):
+    """Tesseract text of a PIL image, after preprocessing."""
+    import pytesseract
+
+    started = time.perf_counter()
+    image = preprocess_image(image)
+    _add_timing(timings, "ocr_preprocess", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    text = pytesseract.image_to_string(image)
+    _add_timing(timings, "ocr", time.perf_counter() - started)
+    return text
+
+
+def _open(source):
+    """Something PdfReader / Image.open accept: the path itself or a stream over the bytes."""
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def _page_text(page, timings, strict=False):
+    """Text layer of a PDF page, or OCR of its images when it has none."""
+    from PIL import Image
+
+    started = time.perf_counter()
+    text = page.extract_text() or ""
+    _add_timing(timings, "pdf_text", time.perf_counter() - started)
+    if text.strip():
+        return text
+
+    texts = []
+    for page_image in page.images:
+        try:
+            texts.append(ocr_image(Image.open(io.BytesIO(page_image.data)), timings))
+        except Exception as e:
+            if strict:
+                raise ExtractionError(f"Error running OCR on a PDF page image: {e}") from e
+            print(f"Error running OCR on a PDF page image: {e}")
+    return "".join(texts)
+
+
+def _extract_pages(source, start, stop, max_chars, strict=False):
+    """Text and stage timings of pages [start, stop), run in a page worker."""
+    from PyPDF2 import PdfReader
+
+    timings = {}
+    reader = PdfReader(_open(source))
+    texts = []
+    length = 0
+    for number in range(start, stop):
+        texts.append(_page_text(reader.pages[number], timings, strict))
+        length += len(texts[-1])
+        if max_chars and length >= max_chars:
+            break
+    return "".join(texts), timings
+
+
+def extract_pdf_text(source, max_chars=MAX_CHARS, timings=None, strict=False):
+    """Text of a PDF (path or bytes), page ranges extracted in parallel for long documents."""
+    from PyPDF2 import PdfReader
+
+    page_count = len(PdfReader(_open(source)).pages)
+    if page_count < PARALLEL_MIN_PAGES or PAGE_WORKERS < 2:
+        text, page_timings = _extract_pages(source, 0, page_count, max_chars, strict)
+        for stage, seconds in page_timings.items():
+            _add_timing(timings, stage, seconds)
+        return text
+
+    # Page ranges are collected in order, so the remaining ones are dropped once max_chars is reached
+    chunk = -(-page_count // (PAGE_WORKERS * 2))
+    texts = []
+    length = 0
+    # Workers of an outer pool are daemonic and may not start processes, threads still overlap the OCR runs
+    executor = ThreadPoolExecutor if multiprocessing.parent_process() is not None else ProcessPoolExecutor
+    with executor(max_workers=PAGE_WORKERS) as pool:
+        futures = [pool.submit(_extract_pages, source, start, min(start + chunk, page_count), max_chars, strict)
+                   for start in range(0, page_count, chunk)]
+        for future in futures:
+            text, page_timings = future.result()
+            for stage, seconds in page_timings.items():
+                _add_timing(timings, stage, seconds)
+            texts.append(text)
+            length += len(text)
+            if max_chars and length >= max_chars:
+                for pending in futures:
+                    pending.cancel()
+                break
+    return "".join(texts)
+
+
+def extract_text(source, max_chars=MAX_CHARS, timings=None, filename=None, strict=False):
+    """Extract text from a file (PDF or image), at most max_chars characters.
+
+    source is a path or the file's bytes; filename (defaulting to the path)
+    decides the file type. Errors are printed and give empty text, unless
+    strict is set, in which case they raise ExtractionError.
+    """
+    started = time.perf_counter()
+    text = ""
+    filename = filename or source
+    if filename.lower().endswith(".pdf"):
+        try:
+            text = extract_pdf_text(source, max_chars, timings, strict)
+        except Exception as e:
+            if strict:
+                raise ExtractionError(f"Error reading PDF file {filename}: {e}") from e
+            print(f"Error reading PDF file {filename}: {e}")
+    elif filename.lower().endswith(IMAGE_EXTENSIONS):
+        from PIL import Image
+
+        try:
+            with Image.open(_open(source)) as image:
+                text = ocr_image(image, timings)
+        except Exception as e:
+            if strict:
+                raise ExtractionError(f"Error reading image file {filename}: {e}") from e
+            print(f"Error reading image file {filename}: {e}")
+    _add_timing(timings, "total", time.perf_counter() - started)
+    return text[:max_chars] if max_chars else text
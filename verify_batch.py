@@ -0,0 +1,64 @@
+"""Verify a directory or zip archive of certificates in one batch.
+
+Usage: python verify_batch.py certificates.zip --format csv --output results.csv
+"""
+import argparse
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from main import allowed_file, results_to_csv, verify_files
+
+
+def collect_files(source):
+    """(sources, names) of the certificate files in a directory tree or zip archive.
+
+    Directory files are returned as paths, zip members as their bytes (never written to disk).
+    """
+    sources, names = [], []
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or not allowed_file(member.filename):
+                    continue
+                sources.append(archive.read(member))
+                names.append(member.filename)
+    else:
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for file_name in sorted(files):
+                if allowed_file(file_name):
+                    sources.append(os.path.join(root, file_name))
+                    names.append(os.path.relpath(sources[-1], source))
+    return sources, names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify many certificates at once.")
+    parser.add_argument("source", help="Directory or .zip archive of PDF/PNG/JPG certificates")
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="Output format")
+    parser.add_argument("--output", help="Write results here instead of stdout")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Extraction processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"{args.source} not found")
+        sys.exit(1)
+
+    sources, names = collect_files(args.source)
+    with ProcessPoolExecutor(args.workers) as pool:
+        results = verify_files(sources, names, pool.map)
+
+    text = results_to_csv(results) if args.format == "csv" else json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            out.write(text)
+        print(f"Verified {len(results)} certificates, results written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()